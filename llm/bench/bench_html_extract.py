@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark for html_extract.py: parse time and token reduction over saved pages.
+
+For every .html file in the given directories (default: fixtures/pages) it times the old
+whole-page extraction (BeautifulSoup html.parser + get_text(), if bs4 is installed) and
+extract_main_text(), and reports the estimated tokens each would send to the model.
+--scale repeats each page's <body> to simulate multi-MB pages.
+
+Usage:
+  ./bench_html_extract.py
+  ./bench_html_extract.py --scale 200 --repeat 3
+  ./bench_html_extract.py ~/saved-pages --json results.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from html_extract import extract_main_text  # noqa: E402
+
+PAGES_DIR = os.path.join(BENCH_DIR, "fixtures", "pages")
+CHARS_PER_TOKEN = 4  # Same rough estimate tldw.py uses
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def soup_text(html):
+    """The extraction the summarizers used before html_extract: all text on the page."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return re.sub(r"[\s\xa0]+", " ", soup.get_text()).strip()
+
+
+def scale_page(html, factor):
+    """Repeat the page body factor times."""
+    if factor <= 1:
+        return html
+    match = re.search(rb"<body[^>]*>(.*)</body>", html, re.DOTALL | re.IGNORECASE)
+    if not match:
+        return html * factor
+    body = match.group(1)
+    return html[: match.start(1)] + body * factor + html[match.end(1):]
+
+
+def time_call(func, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = func(html)
+        timings.append(time.perf_counter() - start)
+    return text, statistics.median(timings)
+
+
+def find_pages(dirs):
+    pages = []
+    for directory in dirs:
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith((".html", ".htm")):
+                pages.append(os.path.join(directory, name))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main-content HTML extraction.")
+    parser.add_argument("dirs", nargs="*", default=[PAGES_DIR], help="Directories of saved .html pages")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat each page body N times")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per page (median is reported)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        have_soup = True
+    except ImportError:
+        print("beautifulsoup4 is not installed; reporting html_extract only.", file=sys.stderr)
+        have_soup = False
+
+    results = []
+    for path in find_pages(args.dirs):
+        with open(path, "rb") as f:
+            html = scale_page(f.read(), args.scale)
+        row = {"page": os.path.basename(path), "bytes": len(html)}
+        text, row["extract_s"] = time_call(extract_main_text, html, args.repeat)
+        row["extract_tokens"] = estimate_tokens(text)
+        if have_soup:
+            text, row["soup_s"] = time_call(soup_text, html, args.repeat)
+            row["soup_tokens"] = estimate_tokens(text)
+        results.append(row)
+
+    if not results:
+        sys.exit("No .html pages found.")
+
+    header = f"{'page':<28} {'bytes':>10} {'extract ms':>11} {'tokens':>8}"
+    if have_soup:
+        header += f" {'soup ms':>10} {'tokens':>8} {'speedup':>8} {'tokens saved':>13}"
+    print(header)
+    for row in results:
+        line = (f"{row['page']:<28} {row['bytes']:>10} {row['extract_s'] * 1000:>11.2f} "
+                f"{row['extract_tokens']:>8}")
+        if have_soup:
+            saved = 1 - row["extract_tokens"] / row["soup_tokens"] if row["soup_tokens"] else 0.0
+            line += (f" {row['soup_s'] * 1000:>10.2f} {row['soup_tokens']:>8} "
+                     f"{row['soup_s'] / row['extract_s']:>7.1f}x {saved:>12.0%}")
+        print(line)
+
+    if have_soup:
+        total_extract = sum(row["extract_tokens"] for row in results)
+        total_soup = sum(row["soup_tokens"] for row in results)
+        time_extract = sum(row["extract_s"] for row in results)
+        time_soup = sum(row["soup_s"] for row in results)
+        print(f"\nTotal: {total_soup} -> {total_extract} tokens "
+              f"({1 - total_extract / total_soup:.0%} fewer), "
+              f"{time_soup * 1000:.1f} -> {time_extract * 1000:.1f} ms "
+              f"({time_soup / time_extract:.1f}x faster)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+
+"""
+A deterministic stand-in for the Ollama HTTP API, for benchmarking the llm/ scripts
+without a real model.
+
+Implements /api/chat, /api/generate (both streaming and non-streaming), /api/tags,
+/api/show, /api/embeddings and /api/embed. Latency, cold model load time, prompt
+evaluation and generation speed, prompt prefix caching, response length and failure rate are configurable, and every request is counted along with the bytes
+the client sent, so benchmark runs can assert on request count and payload size.
+
+Files under --fixtures are served from /fixtures/<path> (counted separately from API
+traffic), so the summarizers' URL inputs can be exercised offline. They carry an ETag and
+Last-Modified, and conditional requests get a 304.
+
+Usage:
+  ./fake_ollama.py --port 11434 --latency 0.2 --tokens-per-sec 40 --prompt-tokens-per-sec 2000
+  curl localhost:11434/_stats
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 11434
+DEFAULT_MODELS = ["mistral-nemo:latest", "llama3.2:1b"]
+DEFAULT_CONTEXT_LENGTH = 131072
+DEFAULT_EMBEDDING_DIM = 64
+FILLER_WORDS = "the model summarizes key points findings arguments and conclusions of this document".split()
+
+
+class FakeOllamaConfig:
+    """Behaviour knobs for the fake server."""
+
+    def __init__(self, latency=0.0, tokens_per_sec=0.0, response_tokens=40, fail_rate=0.0,
+                 prompt_tokens_per_sec=0.0, load_latency=0.0, seed=0, models=None, context_length=DEFAULT_CONTEXT_LENGTH,
+                 embedding_dim=DEFAULT_EMBEDDING_DIM, fixtures_dir=None, fixture_max_age=0, prefix_cache=False):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.load_latency = load_latency
+        self.loaded_models = {}  # model -> threading.Event set once the (simulated) load finished
+        self.load_lock = threading.Lock()
+        # Like Ollama's prompt cache: the last prompt per model, whose common prefix with the
+        # next prompt is not evaluated again (guarded by load_lock, cleared with loaded_models)
+        self.prefix_cache = prefix_cache
+        self.cached_prompts = {}
+        self.response_tokens = response_tokens
+        self.fail_rate = fail_rate
+        self.models = models or list(DEFAULT_MODELS)
+        self.context_length = context_length
+        self.embedding_dim = embedding_dim
+        self.fixtures_dir = fixtures_dir
+        self.fixture_max_age = fixture_max_age  # Cache-Control max-age sent with fixtures
+        self.random = random.Random(seed)
+
+
+class RequestStats:
+    """Thread-safe counters of API requests and the bytes clients sent."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_received = 0
+            self.failures_injected = 0
+            self.fixture_requests = 0
+            self.fixture_not_modified = 0
+            self.prompt_eval_tokens = 0
+            self.by_endpoint = {}
+            self.models = {}
+
+    def record(self, endpoint, body_size, model=None):
+        with self.lock:
+            self.requests += 1
+            self.bytes_received += body_size
+            entry = self.by_endpoint.setdefault(endpoint, {"requests": 0, "bytes_received": 0})
+            entry["requests"] += 1
+            entry["bytes_received"] += body_size
+            if model:
+                self.models[model] = self.models.get(model, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "bytes_received": self.bytes_received,
+                "failures_injected": self.failures_injected,
+                "fixture_requests": self.fixture_requests,
+                "fixture_not_modified": self.fixture_not_modified,
+                "prompt_eval_tokens": self.prompt_eval_tokens,
+                "by_endpoint": json.loads(json.dumps(self.by_endpoint)),
+                "models": dict(self.models),
+            }
+
+
+def _fake_text(seed_text, n_tokens):
+    """Deterministic filler text derived from the prompt, n_tokens words long."""
+    digest = int(hashlib.sha256(seed_text.encode("utf-8")).hexdigest(), 16)
+    return [FILLER_WORDS[(digest >> (i % 200)) % len(FILLER_WORDS)] for i in range(n_tokens)]
+
+
+def _fake_embedding(text, dim):
+    """Deterministic unit vector for text, so similar inputs are stable across runs."""
+    values = []
+    counter = 0
+    while len(values) < dim:
+        block = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        values.extend((b - 127.5) / 127.5 for b in block)
+        counter += 1
+    values = values[:dim]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def _schema_response(schema, words):
+    """Builds a JSON document satisfying a simple object schema of string properties."""
+    properties = schema.get("properties", {}) if isinstance(schema, dict) else {}
+    if not properties:
+        return json.dumps({"response": " ".join(words)})
+    return json.dumps({name: " ".join(words[:8]) or name for name in properties})
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeOllama/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    @property
+    def stats(self):
+        return self.server.stats
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return raw, json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            return raw, {}
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.stats.record("/api/tags", 0)
+            self._send_json(200, {"models": [
+                {"name": name, "model": name, "size": 0, "digest": hashlib.sha256(name.encode()).hexdigest()}
+                for name in self.config.models
+            ]})
+        elif self.path in ("/", "/api/version"):
+            self._send_json(200, {"version": "0.0.0-fake"})
+        elif self.path == "/_stats":
+            self._send_json(200, self.stats.snapshot())
+        elif self.path.startswith("/fixtures/") and self.config.fixtures_dir:
+            self._serve_fixture(self.path[len("/fixtures/"):])
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_HEAD(self):
+        if self.path.startswith("/fixtures/") and self.config.fixtures_dir:
+            self._serve_fixture(self.path[len("/fixtures/"):], head_only=True)
+        else:
+            self.send_response(200 if self.path == "/" else 404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def _serve_fixture(self, relative_path, head_only=False):
+        with self.stats.lock:
+            self.stats.fixture_requests += 1
+        root = os.path.realpath(self.config.fixtures_dir)
+        path = os.path.realpath(os.path.join(root, relative_path.split("?")[0]))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            self._send_json(404, {"error": "fixture not found"})
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            with self.stats.lock:
+                self.stats.fixture_not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={self.config.fixture_max_age}")
+            self.end_headers()
+            return
+        content_type = "application/pdf" if path.endswith(".pdf") else "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(os.path.getmtime(path)))
+        self.send_header("Cache-Control", f"max-age={self.config.fixture_max_age}")
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def do_POST(self):
+        raw, body = self._read_body()
+        endpoint = self.path.split("?")[0]
+        self.stats.record(endpoint, len(raw), body.get("model"))
+
+        if endpoint == "/_reset":
+            self.stats.reset()
+            self._send_json(200, {"ok": True})
+            return
+        if endpoint in ("/api/chat", "/api/generate") and self.config.fail_rate:
+            with self.stats.lock:
+                fail = self.config.random.random() < self.config.fail_rate
+                if fail:
+                    self.stats.failures_injected += 1
+            if fail:
+                self._send_json(500, {"error": "injected failure"})
+                return
+
+        if endpoint == "/api/show":
+            self._send_json(200, {
+                "details": {"family": "fake"},
+                "model_info": {"general.architecture": "fake", "fake.context_length": self.config.context_length},
+            })
+        elif endpoint in ("/api/embeddings", "/api/embed"):
+            self._embed(endpoint, body)
+        elif endpoint in ("/api/chat", "/api/generate"):
+            self._generate(endpoint, body)
+        elif endpoint == "/api/pull":
+            self._send_json(200, {"status": "success"})
+        else:
+            self._send_json(404, {"error": f"unknown endpoint {endpoint}"})
+
+    def _embed(self, endpoint, body):
+        dim = self.config.embedding_dim
+        if endpoint == "/api/embeddings":
+            self._send_json(200, {"embedding": _fake_embedding(body.get("prompt", ""), dim)})
+            return
+        inputs = body.get("input", "")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        self._send_json(200, {"model": body.get("model"), "embeddings": [_fake_embedding(text, dim) for text in inputs]})
+
+    def _load_model(self, model):
+        """Simulates a cold model load: the first request for a model waits load_latency, concurrent ones wait for it."""
+        if not self.config.load_latency:
+            return 0
+        started = time.perf_counter()
+        with self.config.load_lock:
+            loaded = self.config.loaded_models.get(model)
+            first = loaded is None
+            if first:
+                loaded = self.config.loaded_models[model] = threading.Event()
+        if first:
+            time.sleep(self.config.load_latency)
+            loaded.set()
+        else:
+            loaded.wait()
+        return int((time.perf_counter() - started) * 1e9)
+
+    def _cached_prefix_tokens(self, model, prompt):
+        """Tokens at the start of prompt shared with the model's previous prompt (0 without --prefix-cache)."""
+        if not self.config.prefix_cache or not prompt.strip():
+            return 0
+        with self.config.load_lock:
+            previous = self.config.cached_prompts.get(model, "")
+            self.config.cached_prompts[model] = prompt
+        common = len(os.path.commonprefix([previous, prompt]))
+        # The last token is always evaluated, as in llama.cpp
+        return min(common // 4, max(1, len(prompt) // 4) - 1)
+
+    def _generate(self, endpoint, body):
+        if endpoint == "/api/chat":
+            messages = body.get("messages") or []
+            prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        else:
+            prompt = str(body.get("system", "")) + str(body.get("prompt", ""))
+        prompt_tokens = max(1, len(prompt) // 4)
+        cached_tokens = self._cached_prefix_tokens(body.get("model"), prompt)
+        options = body.get("options") or {}
+        n_tokens = min(self.config.response_tokens, int(options.get("num_predict") or self.config.response_tokens))
+        words = _fake_text(prompt, n_tokens)
+        if body.get("format"):
+            words = [_schema_response(body["format"], words)]
+        # An empty chat (or generate with no prompt) just loads the model, like the real API
+        if not prompt.strip():
+            words = []
+
+        load_ns = self._load_model(body.get("model"))
+        started = time.perf_counter()
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        if self.config.prompt_tokens_per_sec and words:
+            time.sleep((prompt_tokens - cached_tokens) / self.config.prompt_tokens_per_sec)
+        per_token = 1.0 / self.config.tokens_per_sec if self.config.tokens_per_sec else 0.0
+        prompt_eval_ns = int((time.perf_counter() - started) * 1e9)
+
+        if words:
+            with self.stats.lock:
+                self.stats.prompt_eval_tokens += prompt_tokens - cached_tokens
+
+        def final_fields(eval_ns):
+            return {
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": prompt_eval_ns + eval_ns,
+                "load_duration": load_ns,
+                "prompt_eval_count": prompt_tokens - cached_tokens,
+                "prompt_eval_duration": prompt_eval_ns,
+                "eval_count": len(words),
+                "eval_duration": eval_ns,
+            }
+
+        def piece(text):
+            if endpoint == "/api/chat":
+                return {"model": body.get("model"), "message": {"role": "assistant", "content": text}, "done": False}
+            return {"model": body.get("model"), "response": text, "done": False}
+
+        if body.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            eval_started = time.perf_counter()
+            for i, word in enumerate(words):
+                if per_token:
+                    time.sleep(per_token)
+                self._write_chunk(piece(word if i == 0 else " " + word))
+            last = piece("")
+            last.update(final_fields(int((time.perf_counter() - eval_started) * 1e9)))
+            self._write_chunk(last)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+            return
+
+        if per_token:
+            time.sleep(per_token * len(words))
+        response = piece(" ".join(words))
+        response.update(final_fields(int(per_token * len(words) * 1e9)))
+        self._send_json(200, response)
+
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """Starts the fake server on a background thread; returns it (see server.server_port, server.stats)."""
+    server = ThreadingHTTPServer((host, port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.config = config or FakeOllamaConfig()
+    server.stats = RequestStats()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Ollama API server for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token (prompt evaluation).")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Generation speed; 0 means instant.")
+    parser.add_argument("--response-tokens", type=int, default=40, help="Tokens generated per response.")
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=0.0,
+                        help="Prompt evaluation speed, so latency grows with prompt size; 0 means instant.")
+    parser.add_argument("--load-latency", type=float, default=0.0,
+                        help="Seconds the first request for each model spends loading it (cold start).")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of generation requests answered with HTTP 500.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for failure injection.")
+    parser.add_argument("--prefix-cache", action="store_true",
+                        help="Skip evaluating the prefix a prompt shares with the model's previous prompt.")
+    parser.add_argument("--fixtures", help="Directory served under /fixtures/.")
+    parser.add_argument("--fixture-max-age", type=int, default=0,
+                        help="Cache-Control max-age for fixtures; 0 makes clients revalidate (304) every time.")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(latency=args.latency, tokens_per_sec=args.tokens_per_sec,
+                              response_tokens=args.response_tokens, fail_rate=args.fail_rate,
+                              prompt_tokens_per_sec=args.prompt_tokens_per_sec, load_latency=args.load_latency,
+                              seed=args.seed, fixtures_dir=args.fixtures, fixture_max_age=args.fixture_max_age,
+                              prefix_cache=args.prefix_cache)
+    server = ThreadingHTTPServer((args.host, args.port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.stats = RequestStats()
+    print(f"Fake Ollama listening on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark harness for the llm/ scripts.
+
+Starts the fake Ollama server from fake_ollama.py, then runs the real entry points
+(tldw.py, ollama_summarizer.py, mistral_7b_summarization.py) as subprocesses over the
+fixture corpus in fixtures/. For each scenario it reports end-to-end latency, the number
+of model requests, the bytes sent to the model, the prompt tokens the model evaluated
+(fewer than were sent when --prefix-cache lets a shared prefix be reused), the number of
+fixture page downloads (a 304 revalidation is not a download), and the peak RSS of the
+process.
+
+tldw.py runs against a throwaway cache directory (TLDW_CACHE_DIR) seeded with the fixture
+transcripts, so no YouTube access is needed. mistral_7b_summarization.py runs against a
+fake llamafile shell script that records the size of each prompt. Every run gets empty
+HTTP and PDF text caches, except the *_warm scenarios, which reuse a cache filled by an
+unmeasured run first.
+
+Results can be saved as a baseline and later runs compared against it; a run fails (exit
+status 1) if any scenario's request count or payload size grows past the tolerance.
+
+Usage:
+  ./run_bench.py                              # all scenarios, table output
+  ./run_bench.py -s tldw_cold -s tldw_warm    # selected scenarios
+  ./run_bench.py --save-baseline baseline.json
+  ./run_bench.py --baseline baseline.json --tolerance 0.05
+  ./run_bench.py --latency 0.5 --tokens-per-sec 30 --repeat 3 --json results.json
+  ./run_bench.py -s tldw_cold -s tldw_raw_transcript --prompt-tokens-per-sec 2000  # normalization savings
+  ./run_bench.py -s ollama_summarizer -s ollama_summarizer_warm --fixture-max-age 300  # HTTP cache hits
+  ./run_bench.py -s ollama_summarizer_long -s ollama_summarizer_retrieve --prompt-tokens-per-sec 2000
+  ./run_bench.py -s ollama_summarizer -s ollama_summarizer_system --prefix-cache --prompt-tokens-per-sec 2000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import fake_ollama
+
+BENCH_DIR = os.path.abspath(os.path.dirname(__file__))
+LLM_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+TRANSCRIPT_FIXTURES = os.path.join(FIXTURES_DIR, "transcripts")
+
+# A long video is simulated by repeating the auto-generated fixture transcript
+LONG_VIDEO_ID = "bnchLONGvid"
+LONG_VIDEO_REPEAT = 40
+# Likewise a document far over the model context, from the meeting notes fixture
+LONG_DOCUMENT_REPEAT = 400
+
+DEFAULT_TOLERANCE = 0.10
+
+FAKE_LLAMAFILE = """#!/bin/sh
+# Fake llamafile for benchmarks: records the prompt size, then prints a canned summary.
+bytes=$(wc -c)
+echo "$bytes" >> "${FAKE_LLAMAFILE_LOG:-/dev/null}"
+sleep "${FAKE_LLAMAFILE_LATENCY:-0}"
+echo "This is a benchmark summary of the provided text.</s>"
+"""
+
+
+def _load_transcript_fixtures():
+    records = []
+    for name in sorted(os.listdir(TRANSCRIPT_FIXTURES)):
+        if name.endswith(".json"):
+            with open(os.path.join(TRANSCRIPT_FIXTURES, name), "r", encoding="utf-8") as f:
+                records.append(json.load(f))
+    base = next(record for record in records if record.get("is_generated"))
+    segments = []
+    offset = 0.0
+    for _ in range(LONG_VIDEO_REPEAT):
+        for segment in base["segments"]:
+            segments.append(dict(segment, start=round(segment["start"] + offset, 2)))
+        offset = segments[-1]["start"] + segments[-1]["duration"]
+    records.append(dict(base, video_id=LONG_VIDEO_ID, segments=segments))
+    return records
+
+
+def seed_tldw_cache(cache_dir, records):
+    """Writes transcript records into a tldw cache directory in the transcript store format."""
+    store_dir = os.path.join(cache_dir, "transcripts")
+    os.makedirs(store_dir, exist_ok=True)
+    for record in records:
+        path = os.path.join(store_dir, f"{record['video_id']}.{record['language']}.json.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(record, f)
+
+
+class BenchContext:
+    """Shared state for a benchmark session: temp dirs, fake server address, fixtures."""
+
+    def __init__(self, server, python, work_dir):
+        self.server = server
+        self.python = python
+        self.work_dir = work_dir
+        self.host_url = f"http://127.0.0.1:{server.server_port}"
+        self.transcripts = _load_transcript_fixtures()
+        self.page_urls = [f"{self.host_url}/fixtures/pages/{name}"
+                          for name in sorted(os.listdir(os.path.join(FIXTURES_DIR, "pages")))]
+        docs_dir = os.path.join(FIXTURES_DIR, "docs")
+        self.documents = [os.path.join(docs_dir, name) for name in sorted(os.listdir(docs_dir))]
+        self.long_document = os.path.join(work_dir, "long_notes.txt")
+        with open(os.path.join(docs_dir, "meeting_notes.txt"), "r", encoding="utf-8") as f:
+            notes = f.read()
+        with open(self.long_document, "w", encoding="utf-8") as f:
+            f.write("\n\n".join([notes] * LONG_DOCUMENT_REPEAT))
+        self.llamafile = os.path.join(work_dir, "fake.llamafile")
+        self.llamafile_log = os.path.join(work_dir, "llamafile.log")
+        with open(self.llamafile, "w", encoding="utf-8") as f:
+            f.write(FAKE_LLAMAFILE)
+        os.chmod(self.llamafile, 0o755)
+        self.warm_cache_dir = os.path.join(work_dir, "tldw_warm_cache")
+        self.warm_http_cache_dir = os.path.join(work_dir, "http_warm_cache")
+
+    def url_list_file(self, video_ids):
+        path = os.path.join(self.work_dir, "urls.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(f"https://www.youtube.com/watch?v={video_id}" for video_id in video_ids) + "\n")
+        return path
+
+    def fresh_cache_dir(self):
+        cache_dir = tempfile.mkdtemp(prefix="tldw_cache_", dir=self.work_dir)
+        seed_tldw_cache(cache_dir, self.transcripts)
+        return cache_dir
+
+
+def build_scenarios(ctx):
+    """Returns the benchmark scenarios. Each has a prepare() returning (cmd, extra_env)."""
+    tldw = os.path.join(LLM_DIR, "tldw.py")
+    video_ids = [record["video_id"] for record in ctx.transcripts]
+    base_tldw = [ctx.python, tldw, "-i", ctx.url_list_file(video_ids), "--jsonl", "--host", ctx.host_url]
+
+    def tldw_scenario(*extra_args):
+        def prepare():
+            return base_tldw + list(extra_args), {"TLDW_CACHE_DIR": ctx.fresh_cache_dir()}
+        return prepare
+
+    def tldw_warm():
+        # Populate the cache once (outside the measurement), then measure the cached run
+        if not os.path.isdir(ctx.warm_cache_dir):
+            seed_tldw_cache(ctx.warm_cache_dir, ctx.transcripts)
+            subprocess.run(base_tldw, env=dict(os.environ, TLDW_CACHE_DIR=ctx.warm_cache_dir),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        return base_tldw, {"TLDW_CACHE_DIR": ctx.warm_cache_dir}
+
+    def ollama_summarizer():
+        cmd = [ctx.python, os.path.join(LLM_DIR, "ollama_summarizer.py"), "-i"] + ctx.page_urls + ctx.documents
+        return cmd, {"OLLAMA_HOST": ctx.host_url}
+
+    def ollama_summarizer_with(*extra_args):
+        def prepare():
+            cmd, env = ollama_summarizer()
+            return cmd + list(extra_args), env
+        return prepare
+
+    def ollama_summarizer_warm():
+        # Fill the HTTP cache once (outside the measurement); pages are then revalidated or reused
+        cmd, env = ollama_summarizer()
+        env["HTTP_CACHE_DIR"] = ctx.warm_http_cache_dir
+        if not os.path.isdir(ctx.warm_http_cache_dir):
+            prime_env = dict(os.environ, XDG_CACHE_HOME=tempfile.mkdtemp(prefix="xdg_cache_", dir=ctx.work_dir),
+                             PDF_TEXT_CACHE_DIR=tempfile.mkdtemp(prefix="pdf_text_", dir=ctx.work_dir))
+            prime_env.update(env)
+            subprocess.run(cmd, env=prime_env, stdin=subprocess.DEVNULL,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        return cmd, env
+
+    def ollama_summarizer_long(*extra_args):
+        # One document far larger than the context, whole or cut down by --retrieve
+        def prepare():
+            cmd = [ctx.python, os.path.join(LLM_DIR, "ollama_summarizer.py"), "-i", ctx.long_document]
+            return cmd + list(extra_args), {"OLLAMA_HOST": ctx.host_url}
+        return prepare
+
+    def ollama_summarizer_startup(*extra_args):
+        # Startup cost alone: --help, and a one-line prompt with no inputs (probe, model check, one chat)
+        def prepare():
+            cmd = [ctx.python, os.path.join(LLM_DIR, "ollama_summarizer.py")] + list(extra_args)
+            return cmd, {"OLLAMA_HOST": ctx.host_url, "XDG_CACHE_HOME": os.path.join(ctx.work_dir, "xdg_cache")}
+        return prepare
+
+    def mistral():
+        cmd = [ctx.python, os.path.join(LLM_DIR, "mistral_7b_summarization.py"),
+               "-lf", ctx.llamafile] + ctx.page_urls + ctx.documents
+        return cmd, {"FAKE_LLAMAFILE_LOG": ctx.llamafile_log}
+
+    return {
+        "tldw_cold": tldw_scenario(),
+        "tldw_warm": tldw_warm,
+        "tldw_raw_transcript": tldw_scenario("--raw-transcript"),
+        "tldw_single_shot": tldw_scenario("--single-shot"),
+        "tldw_stream": tldw_scenario("--stream"),
+        "ollama_summarizer": ollama_summarizer,
+        "ollama_summarizer_warm": ollama_summarizer_warm,
+        "ollama_summarizer_system": ollama_summarizer_with("--system-prompt"),
+        "ollama_summarizer_long": ollama_summarizer_long(),
+        "ollama_summarizer_retrieve": ollama_summarizer_long("--retrieve"),
+        "ollama_summarizer_help": ollama_summarizer_startup("--help"),
+        "ollama_summarizer_prompt": ollama_summarizer_startup("-p", "Reply with one word."),
+        "mistral_7b": mistral,
+    }
+
+
+def _read_llamafile_log(path):
+    if not os.path.isfile(path):
+        return 0, 0
+    with open(path, "r", encoding="utf-8") as f:
+        sizes = [int(line.split()[0]) for line in f if line.strip()]
+    os.remove(path)
+    return len(sizes), sum(sizes)
+
+
+def run_scenario(name, prepare, ctx, verbose=False):
+    """Runs one scenario once; returns its measurements."""
+    cmd, extra_env = prepare()
+    # Fresh HTTP, PDF text and model-list caches per run, so downloads, extraction and
+    # /api/tags are measured cold and the user's ~/.cache is left alone
+    env = dict(os.environ, PDF_TEXT_CACHE_DIR=tempfile.mkdtemp(prefix="pdf_text_", dir=ctx.work_dir),
+               HTTP_CACHE_DIR=tempfile.mkdtemp(prefix="http_cache_", dir=ctx.work_dir),
+               XDG_CACHE_HOME=tempfile.mkdtemp(prefix="xdg_cache_", dir=ctx.work_dir))
+    env.update(extra_env)
+    log_path = os.path.join(ctx.work_dir, f"{name}.log")
+    ctx.server.stats.reset()
+    with ctx.server.config.load_lock:
+        ctx.server.config.loaded_models.clear()
+        ctx.server.config.cached_prompts.clear()
+    _read_llamafile_log(ctx.llamafile_log)
+
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(cmd, env=env, cwd=ctx.work_dir, stdin=subprocess.DEVNULL,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives the resource usage of this child alone, including its peak RSS
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    wall_s = time.perf_counter() - started
+
+    stats = ctx.server.stats.snapshot()
+    llamafile_calls, llamafile_bytes = _read_llamafile_log(ctx.llamafile_log)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    if verbose or process.returncode != 0:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            tail = f.read()[-2000:]
+        print(f"--- {name} output (exit {process.returncode}) ---\n{tail}", file=sys.stderr)
+    return {
+        "scenario": name,
+        "exit_code": process.returncode,
+        "wall_s": round(wall_s, 3),
+        "requests": stats["requests"] + llamafile_calls,
+        "bytes_sent": stats["bytes_received"] + llamafile_bytes,
+        "prompt_eval_tokens": stats["prompt_eval_tokens"],
+        "page_fetches": stats["fixture_requests"] - stats["fixture_not_modified"],
+        "page_revalidations": stats["fixture_not_modified"],
+        "by_endpoint": stats["by_endpoint"],
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+
+
+def summarize_runs(runs):
+    """Collapses repeated runs: median wall time, max RSS, counts from the last run."""
+    result = dict(runs[-1])
+    result["wall_s"] = round(statistics.median(run["wall_s"] for run in runs), 3)
+    result["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+    result["runs"] = len(runs)
+    return result
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns regression messages for scenarios whose request count or payload grew past tolerance."""
+    previous = {entry["scenario"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if not before:
+            continue
+        for metric in ("requests", "bytes_sent", "page_fetches"):
+            limit = before[metric] * (1 + tolerance)
+            if result[metric] > limit:
+                regressions.append(f"{result['scenario']}: {metric} {before[metric]} -> {result[metric]} "
+                                   f"(+{(result[metric] / max(before[metric], 1) - 1):.0%})")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'Scenario':<26} {'Exit':>4} {'Wall (s)':>9} {'Requests':>9} {'Bytes sent':>12} {'Prompt eval':>12} "
+          f"{'Page fetches':>13} {'Peak RSS (MB)':>14}")
+    for result in results:
+        print(f"{result['scenario']:<26} {result['exit_code']:>4} {result['wall_s']:>9.2f} "
+              f"{result['requests']:>9} {result['bytes_sent']:>12} {result.get('prompt_eval_tokens', 0):>12} "
+              f"{result.get('page_fetches', 0):>13} {result['peak_rss_mb']:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the llm/ scripts against a fake Ollama server.")
+    parser.add_argument("-s", "--scenario", action="append", help="Scenario to run (repeatable). Default: all.")
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; wall time is the median.")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter used to run the scripts.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake model latency before the first token (s).")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Fake generation speed; 0 means instant.")
+    parser.add_argument("--response-tokens", type=int, default=40, help="Tokens per fake response.")
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=0.0,
+                        help="Fake prompt evaluation speed, so latency tracks prompt size; 0 means instant.")
+    parser.add_argument("--load-latency", type=float, default=0.0,
+                        help="Fake cold model load time; every scenario starts with the models unloaded.")
+    parser.add_argument("--prefix-cache", action="store_true",
+                        help="Fake Ollama's prompt cache: a prefix shared with the previous prompt is not re-evaluated.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of generation requests that fail.")
+    parser.add_argument("--fixture-max-age", type=int, default=0,
+                        help="Cache-Control max-age on fixture pages; 0 means revalidate on every use.")
+    parser.add_argument("--json", dest="json_output", help="Write results as JSON to this file.")
+    parser.add_argument("--save-baseline", help="Save results as a baseline file.")
+    parser.add_argument("--baseline", help="Compare against a baseline file; exit 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative growth in requests/bytes before a regression is reported.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show each script's output.")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directory.")
+    args = parser.parse_args()
+
+    config = fake_ollama.FakeOllamaConfig(latency=args.latency, tokens_per_sec=args.tokens_per_sec,
+                                          response_tokens=args.response_tokens, fail_rate=args.fail_rate,
+                                          prompt_tokens_per_sec=args.prompt_tokens_per_sec,
+                                          load_latency=args.load_latency, fixtures_dir=FIXTURES_DIR,
+                                          fixture_max_age=args.fixture_max_age, prefix_cache=args.prefix_cache)
+    server = fake_ollama.start_server(config)
+    work_dir = tempfile.mkdtemp(prefix="llm_bench_")
+    ctx = BenchContext(server, args.python, work_dir)
+    scenarios = build_scenarios(ctx)
+
+    if args.list:
+        print("\n".join(scenarios))
+        return
+    selected = args.scenario or list(scenarios)
+    unknown = [name for name in selected if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = []
+    try:
+        for name in selected:
+            runs = [run_scenario(name, scenarios[name], ctx, args.verbose) for _ in range(max(1, args.repeat))]
+            results.append(summarize_runs(runs))
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f"Work directory kept at {work_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table(results)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {"latency": args.latency, "tokens_per_sec": args.tokens_per_sec,
+                   "response_tokens": args.response_tokens, "fail_rate": args.fail_rate,
+                   "prompt_tokens_per_sec": args.prompt_tokens_per_sec, "load_latency": args.load_latency,
+                   "fixture_max_age": args.fixture_max_age, "prefix_cache": args.prefix_cache},
+        "results": results,
+    }
+    for path in (args.json_output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    exit_code = 1 if any(result["exit_code"] != 0 for result in results) else 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            exit_code = 1
+        else:
+            print("\nNo request-count or payload regressions against baseline.")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
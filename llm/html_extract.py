@@ -0,0 +1,296 @@
+"""
+Main-content text extraction for web pages, shared by the summarizer scripts.
+
+The page is tokenized once with the standard library's streaming HTMLParser (no tree is
+built), split into text blocks at block-level tags, and each block is scored for
+boilerplate: blocks inside nav/header/footer/aside/form, or inside small or link-heavy
+elements whose class or id looks like a cookie banner, menu, share bar, ad slot and so
+on are marked as furniture while parsing, and the remaining blocks are kept if they read
+like prose (enough words, few of them inside links). When the page marks its content
+with <article> or <main>, only blocks inside it are considered, and short lines there
+(list items, table cells) are kept too when they sit next to prose. If that leaves too
+little, all visible text (furniture included) is returned instead, so a page with any
+text never comes back empty.
+
+    from html_extract import extract_main_text
+    text = extract_main_text(response.content)
+
+bench/bench_html_extract.py measures parse time and token reduction over saved pages.
+"""
+
+import re
+from html.parser import HTMLParser
+
+# Elements whose content is never text for the model
+SKIP_TAGS = frozenset(
+    {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+     "select", "button", "textarea"}
+)
+# Page furniture; the whole subtree is dropped
+BOILERPLATE_TAGS = frozenset({"nav", "header", "footer", "aside", "form", "dialog", "menu"})
+# class/id fragments that mark furniture inside otherwise ordinary divs
+BOILERPLATE_ATTR = re.compile(
+    r"(?:^|[\s_-])(?:cookie|consent|banner|nav|navbar|menu|breadcrumbs?|footer|header|"
+    r"sidebar|share|sharing|social|subscribe|newsletter|signup|promo|advert|ad|ads|"
+    r"ad-slot|sponsor|related|recommended|popular|trending|comments?|disqus|modal|"
+    r"popup|overlay|skip-link|pagination|tags?)(?:$|[\s_-])",
+    re.IGNORECASE,
+)
+CONTENT_TAGS = frozenset({"article", "main"})
+BLOCK_TAGS = frozenset(
+    {"p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd",
+     "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "table", "tr", "td",
+     "th", "figcaption", "caption", "address", "body", "hr"}
+)
+HEADING_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+VOID_TAGS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+     "param", "source", "track", "wbr"}
+)
+
+EXTRACTOR_VERSION = 3  # Bump when the output for the same page changes (cached text is keyed on it)
+MIN_BLOCK_WORDS = 10  # Shorter blocks outside headings are usually captions and labels
+MAX_LINK_DENSITY = 0.33  # Share of a block's characters inside <a> before it counts as links
+MIN_CONTENT_WORDS = 50  # Below this an <article>/<main> is not trusted as the content
+MIN_EXTRACTED_WORDS = 25  # Below this the page is not prose; fall back to all visible text
+MAX_ATTR_FURNITURE_WORDS = 150  # Larger class/id-matched subtrees are furniture only if link-heavy
+
+_WHITESPACE = re.compile(r"[\s\xa0]+")
+_LINE_BREAK = "\x00"  # Stands for <br> in block text; NULs in the page itself are dropped
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+
+class _Block:
+    __slots__ = ("tag", "parts", "link_chars", "in_content", "furniture")
+
+    def __init__(self, tag, in_content, furniture):
+        self.tag = tag
+        self.parts = []
+        self.link_chars = 0
+        self.in_content = in_content
+        self.furniture = furniture
+
+    def text(self):
+        """Block text with whitespace collapsed; each <br> starts a new line."""
+        lines = "".join(self.parts).split(_LINE_BREAK)
+        lines = (_WHITESPACE.sub(" ", line).strip() for line in lines)
+        return "\n".join(line for line in lines if line)
+
+
+class _BlockParser(HTMLParser):
+    """
+    Streaming tokenizer that groups visible text into blocks and marks page furniture.
+
+    Furniture is kept (flagged) rather than dropped, so the caller can fall back to it.
+    A block element whose class/id looks like furniture only marks its subtree if that
+    subtree is small or mostly links: wrappers such as "container has-sidebar" hold the
+    whole article. Headings are only marked that way in link-heavy subtrees
+    ("article-header" holds the <h1>).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self.title = []
+        self.stack = []  # (tag, skipped, content, furniture, first block or None) per open element
+        self.skip_depth = 0
+        self.content_depth = 0
+        self.furniture_depth = 0
+        self.link_depth = 0
+        self.in_title = False
+        self.has_content_tag = False
+        self.current = None
+
+    def _flush(self):
+        block = self.current
+        if block is not None and block.parts:
+            self.blocks.append(block)
+        self.current = None
+
+    def _new_block(self, tag):
+        self.current = _Block(tag, self.content_depth > 0, self.furniture_depth > 0)
+
+    def _mark_furniture(self, first):
+        """Flag the blocks of a class/id-matched subtree if it is small or link-heavy."""
+        subtree = self.blocks[first:]
+        texts = [block.text() for block in subtree]
+        words = sum(len(text.split()) for text in texts)
+        chars = sum(len(text) for text in texts)
+        links = sum(block.link_chars for block in subtree)
+        link_heavy = links > MAX_LINK_DENSITY * chars
+        if words <= MAX_ATTR_FURNITURE_WORDS or link_heavy:
+            for block in subtree:
+                if link_heavy or block.tag not in HEADING_TAGS:
+                    block.furniture = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self.in_title = True
+            return
+        if tag in VOID_TAGS:
+            if self.skip_depth:
+                return
+            if tag == "br":
+                # A line break, not a new block: short lines of one paragraph stay together
+                if self.current is not None:
+                    self.current.parts.append(_LINE_BREAK)
+            elif tag in BLOCK_TAGS:
+                self._flush()
+            return
+        skipped = self.skip_depth > 0 or tag in SKIP_TAGS
+        content = tag in CONTENT_TAGS
+        # A <header> inside the article holds its headline, not site furniture
+        furniture = tag in BOILERPLATE_TAGS and not (tag == "header" and self.content_depth)
+        first = None
+        if not skipped and not furniture and tag in BLOCK_TAGS and tag not in CONTENT_TAGS and tag != "body":
+            attrs = dict(attrs)
+            marker = f"{attrs.get('class') or ''} {attrs.get('id') or ''}"
+            if marker.strip() and BOILERPLATE_ATTR.search(marker):
+                self._flush()
+                first = len(self.blocks)
+        self.stack.append((tag, skipped, content, furniture, first))
+        if skipped:
+            self.skip_depth += 1
+            return
+        if content:
+            self.content_depth += 1
+            self.has_content_tag = True
+        if furniture:
+            self.furniture_depth += 1
+        if tag == "a":
+            self.link_depth += 1
+        if tag in BLOCK_TAGS or furniture:
+            self._flush()
+            self._new_block(tag)
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self.in_title = False
+            return
+        # Close up to the matching start tag; stray end tags are ignored
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > i:
+            open_tag, skipped, content, furniture, first = self.stack.pop()
+            if skipped:
+                self.skip_depth -= 1
+                continue
+            if content:
+                self.content_depth -= 1
+            if open_tag == "a":
+                self.link_depth -= 1
+            if open_tag in BLOCK_TAGS or furniture:
+                self._flush()
+            if furniture:
+                self.furniture_depth -= 1
+            if first is not None:
+                self._mark_furniture(first)
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title.append(data)
+            return
+        if self.skip_depth:
+            return
+        if self.current is None:
+            self._new_block("")
+        self.current.parts.append(data.replace(_LINE_BREAK, ""))
+        if self.link_depth:
+            self.current.link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _decode(html, encoding=None):
+    """Decode page bytes using the given encoding, a <meta charset>, or UTF-8."""
+    if isinstance(html, str):
+        return html
+    if not encoding:
+        match = _META_CHARSET.search(html[:4096])
+        encoding = match.group(1).decode("ascii", "replace") if match else "utf-8"
+    try:
+        return html.decode(encoding, errors="replace")
+    except LookupError:
+        return html.decode("utf-8", errors="replace")
+
+
+def _is_prose(block, text):
+    words = len(text.split())
+    if block.tag in HEADING_TAGS:
+        return words > 0 and block.link_chars < len(text)
+    if words < MIN_BLOCK_WORDS:
+        return False
+    return block.link_chars <= MAX_LINK_DENSITY * len(text)
+
+
+def _keep_short_lines(candidates, keep):
+    """
+    Also keep runs of short blocks (list items, table cells, short lines) that border a
+    kept block; blocks that are nothing but links are skipped. Used inside <article>/<main>.
+    """
+    keep = list(keep)
+    short = [block.tag not in HEADING_TAGS for block, _ in candidates]
+    start = 0
+    while start < len(candidates):
+        if keep[start] or not short[start]:
+            start += 1
+            continue
+        end = start
+        while end < len(candidates) and not keep[end] and short[end]:
+            end += 1
+        if (start > 0 and keep[start - 1]) or (end < len(candidates) and keep[end]):
+            for index in range(start, end):
+                block, text = candidates[index]
+                keep[index] = block.link_chars < len(text)
+        start = end
+    return keep
+
+
+def parse_blocks(html, encoding=None):
+    """Tokenize a page into (title, blocks, has_content_tag); furniture blocks are flagged."""
+    parser = _BlockParser()
+    parser.feed(_decode(html, encoding))
+    parser.close()
+    title = _WHITESPACE.sub(" ", "".join(parser.title)).strip()
+    return title, parser.blocks, parser.has_content_tag
+
+
+def extract_main_text(html, encoding=None, include_title=True):
+    """
+    Main article text of an HTML page (bytes or str), one paragraph per line.
+
+    Falls back to all visible text (only scripts and the like removed) when no block
+    reads like prose, e.g. on index pages or very short documents.
+    """
+    title, blocks, has_content_tag = parse_blocks(html, encoding)
+    texts = [(block, block.text()) for block in blocks]
+    texts = [(block, text) for block, text in texts if text]
+
+    candidates = [(block, text) for block, text in texts if not block.furniture]
+    in_content = False
+    if has_content_tag:
+        inside = [(block, text) for block, text in candidates if block.in_content]
+        if sum(len(text.split()) for _, text in inside) >= MIN_CONTENT_WORDS:
+            candidates = inside
+            in_content = True
+
+    keep = [_is_prose(block, text) for block, text in candidates]
+    if in_content:
+        keep = _keep_short_lines(candidates, keep)
+    kept = [(block, text) for (block, text), keep_block in zip(candidates, keep) if keep_block]
+    # A heading only belongs to the article if prose follows it
+    while kept and kept[-1][0].tag in HEADING_TAGS:
+        kept.pop()
+    kept = [text for _, text in kept]
+    if sum(len(text.split()) for text in kept) < MIN_EXTRACTED_WORDS:
+        kept = [text for _, text in texts]
+
+    # Page titles usually repeat the headline plus the site name
+    if include_title and title and not (kept and (kept[0] in title or title in kept[0])):
+        kept.insert(0, title)
+    return "\n".join(kept)
@@ -0,0 +1,287 @@
+"""
+On-disk HTTP response cache for the summarizers' URL inputs.
+
+A private cache in the RFC 9111 sense: responses are stored unless Cache-Control says
+no-store, served without a request while fresh (max-age, else Expires, else a heuristic
+based on Last-Modified), and revalidated with If-None-Match / If-Modified-Since once
+stale, so an unchanged page costs a 304 rather than a download. If the network fails, a
+stale copy is served rather than nothing. Vary is ignored apart from "Vary: *" (not
+cached), since the summarizers only ever send one kind of request.
+
+Each entry is a raw body (<key>.body), metadata (<key>.json, written last) and any text
+extracted from the body (<key>.<name>.txt), so re-summarizing a page with another prompt
+or model skips both the download and the extraction. The cache is capped in size and
+evicts least recently used entries. It lives in $HTTP_CACHE_DIR, or
+$XDG_CACHE_HOME/http_cache (~/.cache/http_cache).
+
+    from http_cache import HTTPCache
+    response = HTTPCache().get(url, session, headers=headers, timeout=5)
+    text = response.extracted_text("main-v1", lambda: extract(response.content))
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_DIR = os.environ.get("HTTP_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "http_cache",
+)
+DEFAULT_MAX_BYTES = int(float(os.environ.get("HTTP_CACHE_MAX_MB") or 256) * 1024 * 1024)
+HEURISTIC_FRACTION = 0.1  # Of the time since Last-Modified, as RFC 9111 suggests
+HEURISTIC_MAX_SECONDS = 24 * 3600
+DEFAULT_FRESH_SECONDS = 600  # Responses with neither freshness info nor Last-Modified
+# Response headers kept with an entry; the rest are of no use to the callers
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Expires", "Date", "Age")
+
+_DIRECTIVE = re.compile(r"\s*([\w-]+)\s*(?:=\s*(\"[^\"]*\"|[^,]*))?\s*(?:,|$)")
+
+
+def parse_cache_control(value):
+    """Cache-Control header as {directive: value or None}, directives lower-cased."""
+    directives = {}
+    for name, arg in _DIRECTIVE.findall(value or ""):
+        directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _http_date(value):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers):
+    """How long a response stays fresh after it was received, in seconds."""
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-cache" in directives:
+        return 0
+    max_age = _seconds(directives.get("max-age"))
+    if max_age is not None:
+        return max_age
+    date = _http_date(headers.get("Date")) or time.time()
+    expires = headers.get("Expires")
+    if expires is not None:
+        expires_at = _http_date(expires)
+        return max(0, expires_at - date) if expires_at else 0
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified:
+        return min(HEURISTIC_MAX_SECONDS, max(0, date - last_modified) * HEURISTIC_FRACTION)
+    return DEFAULT_FRESH_SECONDS
+
+
+def is_storable(response):
+    directives = parse_cache_control(response.headers.get("Cache-Control"))
+    return (
+        response.status_code == 200
+        and "no-store" not in directives
+        and response.headers.get("Vary", "").strip() != "*"
+    )
+
+
+class CachedResponse:
+    """
+    The parts of a requests.Response the summarizers use, backed by a cache entry.
+
+    cache_status is 'hit' (no request made), 'revalidated' (304), 'miss' (downloaded)
+    or 'stale' (served from the cache because the request failed). A response that was
+    not stored (no-store and the like) keeps its extracted text in memory only.
+    """
+
+    def __init__(self, cache, key, meta, content, cache_status, stored=True):
+        self._cache = cache
+        self._key = key
+        self.url = meta["url"]
+        self.status_code = meta["status"]
+        self.headers = CaseInsensitiveDict(meta["headers"])
+        self.encoding = meta.get("encoding")
+        self.content = content
+        self.cache_status = cache_status
+        self.stored = stored
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self):
+        pass  # Only successful responses are cached
+
+    def extracted_text(self, name, extract):
+        """Text derived from the body by extract(), computed once per body and name."""
+        if not self.stored:
+            return extract()
+        path = self._cache.path(self._key, f"{name}.txt")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            pass
+        text = extract()
+        if text:  # An empty extraction is not worth keeping; the next run tries again
+            self._cache.write_file(path, text.encode("utf-8"))
+        return text
+
+
+class HTTPCache:
+    """Conditional-GET cache with size-capped LRU eviction; safe to share across threads."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def path(self, key, suffix):
+        return os.path.join(self.cache_dir, f"{key}.{suffix}")
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def write_file(self, path, data):
+        """Atomic write; the cache is best effort, so failures are ignored."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            return True
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
+
+    def _load(self, key):
+        """(meta, body) of an entry, or (None, None) if absent or incomplete."""
+        try:
+            with open(self.path(key, "json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self.path(key, "body"), "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        if len(body) != meta.get("size"):
+            return None, None
+        return meta, body
+
+    def _store_meta(self, key, meta):
+        self.write_file(self.path(key, "json"), json.dumps(meta).encode("utf-8"))
+
+    def _remove(self, key):
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(key + "."):
+                try:
+                    os.unlink(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def get(self, url, session=None, headers=None, timeout=None):
+        """
+        GET a URL through the cache. Raises requests.RequestException like requests.get
+        when the page cannot be fetched and no cached copy exists.
+        """
+        key = self.key(url)
+        meta, body = self._load(key)
+        now = time.time()
+        if meta is not None:
+            age = now - meta["stored_at"] + (_seconds(meta["headers"].get("Age")) or 0)
+            if age < freshness_lifetime(meta["headers"]):
+                self._touch(key)
+                return CachedResponse(self, key, meta, body, "hit")
+
+        request_headers = dict(headers or {})
+        if meta is not None:
+            if meta["headers"].get("ETag"):
+                request_headers["If-None-Match"] = meta["headers"]["ETag"]
+            if meta["headers"].get("Last-Modified"):
+                request_headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+        try:
+            response = (session or requests).get(
+                url, allow_redirects=True, timeout=timeout, headers=request_headers
+            )
+            if response.status_code != 304:
+                response.raise_for_status()
+        except requests.RequestException:
+            if meta is None:
+                raise
+            return CachedResponse(self, key, meta, body, "stale")
+
+        if response.status_code == 304 and meta is not None:
+            # Refresh freshness info from the 304; the stored body and extracted text stand
+            for name in STORED_HEADERS:
+                if name in response.headers and name != "Content-Type":
+                    meta["headers"][name] = response.headers[name]
+            meta["stored_at"] = now
+            self._store_meta(key, meta)
+            return CachedResponse(self, key, meta, body, "revalidated")
+
+        content_type = response.headers.get("Content-Type", "").lower()
+        meta = {
+            "url": response.url,
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+            "encoding": response.encoding if "charset=" in content_type else None,
+            "stored_at": now,
+            "size": len(response.content),
+        }
+        stored = False
+        self._remove(key)  # Drops the previous body and any text extracted from it
+        if is_storable(response) and self.write_file(self.path(key, "body"), response.content):
+            self._store_meta(key, meta)
+            self._evict()
+            stored = True
+        return CachedResponse(self, key, meta, response.content, "miss", stored)
+
+    def _touch(self, key):
+        try:
+            os.utime(self.path(key, "json"))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = {}
+        total = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            key = name.split(".", 1)[0]
+            size, used = entries.get(key, (0, 0))
+            if name.endswith(".json"):
+                used = stat.st_mtime
+            entries[key] = (size + stat.st_size, used)
+            total += stat.st_size
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
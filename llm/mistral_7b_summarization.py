@@ -2,7 +2,6 @@
 # /// script
 # dependencies = [
 #     "alive-progress",
-#     "beautifulsoup4",
 #     "pymupdf",
 #     "requests",
 # ]
@@ -24,7 +23,10 @@ from urllib.parse import urlparse
 
 import requests
 from alive_progress import alive_bar
-from bs4 import BeautifulSoup
+
+from html_extract import EXTRACTOR_VERSION, extract_main_text
+from http_cache import HTTPCache
+from pdf_extract import read_pdf_text
 
 TIMEOUT_SECONDS = 5
 DEFAULT_SUMMARIZATION_PROMPT = "[INST]Summarize the following text:"
@@ -58,13 +60,13 @@ def get_text_from_url(url):
     headers = {"User-Agent": get_user_agent()}
 
     try:
-        response = requests.get(
-            url, allow_redirects=True, timeout=TIMEOUT_SECONDS, headers=headers
+        response = HTTPCache().get(url, headers=headers, timeout=TIMEOUT_SECONDS)
+        content_type = response.headers.get("Content-Type", "").lower()
+        encoding = response.encoding if "charset=" in content_type else None
+        return response.extracted_text(
+            f"main-v{EXTRACTOR_VERSION}",
+            lambda: extract_main_text(response.content, encoding),
         )
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-        text = soup.get_text()
-        return re.sub(r"[\s\xa0]+", " ", text).strip()
     except requests.RequestException as e:
         print(f"\nFailed to fetch URL {url}: {e}")
         return None
@@ -112,10 +114,7 @@ def read_input(input_path):
     try:
         file_extension = os.path.splitext(input_path)[1].lower()
         if file_extension == ".pdf":
-            import fitz  # PyMuPDF
-
-            doc = fitz.open(input_path)
-            return "".join([page.get_text() for page in doc])
+            return read_pdf_text(input_path)
 
         with open(input_path, "r", encoding="utf-8") as f:
             return f.read()
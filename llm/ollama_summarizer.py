@@ -1,7 +1,7 @@
 #!/usr/bin/env -S uv run --script
 # /// script
 # dependencies = [
-#     "beautifulsoup4",
+#     "numpy",
 #     "ollama",
 #     "requests",
 #     "tqdm",
@@ -16,7 +16,7 @@ TODO:
 - [x] Add URL summarization
 - [x] Replace print statements with logging
 - [x] Dynamically show available Ollama models
-- [ ] Handle multiple inputs in the command line
+- [x] Handle multiple inputs in the command line
 """
 
 import sys
@@ -26,24 +26,55 @@ import json
 import platform
 import pathlib
 import argparse
+import concurrent.futures
+import contextlib
 import logging
 import random
 import re
+import threading
 import time
 from time import sleep
-from urllib.parse import quote
+from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
-import ollama
 from tqdm import tqdm
 
-if sys.version_info >= (3, 12):
-    os.system("cls" if os.name == "nt" else "clear")  # Clear the terminal screen
+from html_extract import EXTRACTOR_VERSION, extract_main_text
+from http_cache import HTTPCache
+from pdf_extract import read_pdf_text
+
+# ollama and numpy are imported where they are used; importing them up front slowed
+# down --help and every run that never reached them.
 
 DEFAULT_MODEL = "mistral-nemo:latest"
 DEFAULT_TEMP = 0.0
 TIMEOUT_SECONDS = 5
+# Model requests in flight at once; match the server's OLLAMA_NUM_PARALLEL
+DEFAULT_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL") or 4)
+DEFAULT_FETCH_WORKERS = 8  # Concurrent input downloads/extractions
+DEFAULT_OLLAMA_HOST = "http://localhost:11434"
+PROBE_TIMEOUT_SECONDS = 0.5  # Readiness probe against the Ollama HTTP API
+STARTUP_WAIT_SECONDS = 15  # How long to wait for Ollama after launching it
+READY_WAIT_SECONDS = 5  # Grace period for a busy or remote Ollama before giving up
+PROBE_BACKOFF_SECONDS = (0.05, 2.0)  # First and longest delay between readiness probes
+METER_REFRESH_SECONDS = 0.2  # How often the tokens/sec display is updated
+PRELOAD_TIMEOUT_SECONDS = 300
+# How long Ollama keeps the model (and its cached prompt prefix) loaded after a request
+DEFAULT_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE") or "30m"  # Loading a large model from disk can take a while
+# Retrieval (--retrieve): documents over the context budget are cut into chunks, and the
+# chunks most similar to the prompt are sent instead of letting the model truncate
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("OLLAMA_CONTEXT_LENGTH") or 4096)
+RESPONSE_RESERVE_TOKENS = 1024  # Context left free for the summary itself
+DEFAULT_EMBED_MODEL = os.environ.get("OLLAMA_EMBED_MODEL") or "nomic-embed-text"
+CHUNK_TOKENS = 256
+EMBED_BATCH_SIZE = 64  # Chunks per embed request
+CHARS_PER_TOKEN = 4  # Rough average for English text
+MODEL_CACHE_TTL_SECONDS = 300  # How long the on-disk model list is trusted
+MODEL_CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "ollama_summarizer",
+    "models.json",
+)
 DEFAULT_PROMPT = "As a helpful assistant, your task is to provide a concise and precise summary of the given document. Focus on extracting the main points and relevant details from the text while maintaining brevity in your response. Ensure that your summary captures the essence of the conversation or discussion without sacrificing accuracy. Please note that you should be able to handle various types of documents, such as interviews, meetings, transcripts, or presentations. Your response should be flexible enough to allow for different topics and contexts while still providing a clear and focused summary."
 
 USER_AGENTS = [
@@ -54,43 +85,108 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
 ]
 
+HTTP_CACHE = HTTPCache()  # Shared with mistral_7b_summarization.py
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 
-def get_available_models():
-    """Get list of available models from Ollama."""
-    try:
-        # First try using the ollama Python client
-        models_response = ollama.list()
-        if isinstance(models_response, dict) and "models" in models_response:
-            models = [model["name"] for model in models_response["models"]]
-            return models
+def get_ollama_host():
+    """Ollama base URL from OLLAMA_HOST (same variable the ollama library reads)."""
+    host = os.environ.get("OLLAMA_HOST") or DEFAULT_OLLAMA_HOST
+    if "://" not in host:
+        host = "http://" + host
+    return host.rstrip("/")
 
-        # If the Python client doesn't work as expected, fallback to CLI
-        else:
-            result = subprocess.run(
-                ["ollama", "list"], capture_output=True, text=True, check=True
-            )
 
-            # Parse the output manually since it's not in JSON format
-            models = []
-            for line in result.stdout.strip().split("\n"):
-                # Skip the header line
-                if line.startswith("NAME") or not line.strip():
-                    continue
+def ollama_ready(host, timeout=PROBE_TIMEOUT_SECONDS):
+    """Return True if the Ollama HTTP API answers."""
+    try:
+        return requests.get(f"{host}/api/version", timeout=timeout).ok
+    except requests.RequestException:
+        return False
 
-                # Extract the model name (first column before any whitespace)
-                model_name = line.split()[0].strip()
-                if model_name:
-                    models.append(model_name)
 
-            return models if models else ["mistral-nemo", "llama3"]
-    except (subprocess.SubprocessError, KeyError, FileNotFoundError) as e:
-        logging.warning(f"Could not retrieve model list: {str(e)}")
-        # Return some default models if we can't get the actual list
-        return ["mistral-nemo"]
+def _read_model_cache():
+    try:
+        with open(MODEL_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_model_cache(cache):
+    # Expired hosts would otherwise pile up (e.g. one per port of a test server)
+    now = time.time()
+    cache = {
+        host: entry for host, entry in cache.items()
+        if isinstance(entry, dict) and now - entry.get("fetched_at", 0) < MODEL_CACHE_TTL_SECONDS
+    }
+    try:
+        os.makedirs(os.path.dirname(MODEL_CACHE_FILE), exist_ok=True)
+        temp_path = f"{MODEL_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(temp_path, MODEL_CACHE_FILE)
+    except OSError as e:
+        logging.debug("Could not write model cache: %s", str(e))
+
+
+def get_available_models(host, refresh=False):
+    """
+    Get the list of models pulled into Ollama (/api/tags).
+
+    The list is cached on disk per host for MODEL_CACHE_TTL_SECONDS; refresh bypasses it.
+    Returns None if Ollama cannot be reached.
+    """
+    cache = _read_model_cache()
+    entry = cache.get(host)
+    if (
+        not refresh
+        and isinstance(entry, dict)
+        and time.time() - entry.get("fetched_at", 0) < MODEL_CACHE_TTL_SECONDS
+    ):
+        return entry.get("models", [])
+    try:
+        response = requests.get(f"{host}/api/tags", timeout=TIMEOUT_SECONDS)
+        response.raise_for_status()
+        models = [model["name"] for model in response.json().get("models", [])]
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        logging.warning("Could not retrieve model list: %s", str(e))
+        return None
+    cache[host] = {"fetched_at": time.time(), "models": models}
+    _write_model_cache(cache)
+    return models
+
+
+def _same_model(name, candidate):
+    """Model names match with or without the implicit ':latest' tag."""
+    if ":" not in name:
+        name += ":latest"
+    if ":" not in candidate:
+        candidate += ":latest"
+    return name == candidate
+
+
+def validate_model(model, host):
+    """
+    Check that the model is available before it is used. A cached model list that
+    lacks the model is refreshed once, so newly pulled models are picked up.
+    """
+    models = get_available_models(host)
+    if models is not None and not any(_same_model(model, m) for m in models):
+        models = get_available_models(host, refresh=True)
+    if models is None:
+        return  # Cannot tell; let the request itself report the problem
+    if not any(_same_model(model, m) for m in models):
+        logging.error(
+            "Model %s is not available. Pull it with 'ollama pull %s' or choose one of: %s",
+            model,
+            model,
+            ", ".join(models) or "(none)",
+        )
+        sys.exit(1)
 
 
 def get_user_agent():
@@ -99,45 +195,90 @@ def get_user_agent():
 
 
 def is_valid_url(url):
-    """Check if the URL is valid and follow redirects."""
+    """Check that the input is an http(s) URL (syntax only, no request is made)."""
     if pathlib.Path(url).exists():
         return False
+    parsed = urlparse(url)
+    return parsed.scheme in ("http", "https") and bool(parsed.netloc)
+
+
+def fetch_url(url, session=None):
+    """
+    Fetch a URL through the HTTP cache, following redirects. Unchanged pages are not
+    downloaded again. Raises requests.RequestException on failure.
+    """
+    response = HTTP_CACHE.get(
+        url,
+        session,
+        headers={"User-Agent": get_user_agent()},
+        timeout=TIMEOUT_SECONDS,
+    )
+    logging.debug("%s: %s", url, response.cache_status)
+    return response
+
+
+def extract_text_from_html(html, encoding=None):
+    """Main article text of an HTML document, without navigation, banners and footers."""
+    return extract_main_text(html, encoding)
+
+
+def text_from_response(response):
+    """Extract text from a fetched page; plain-text responses are used as is."""
+    content_type = response.headers.get("Content-Type", "").lower()
+    # Without a declared charset, requests guesses latin-1; let the page's <meta> decide
+    encoding = response.encoding if "charset=" in content_type else None
+    content_type = content_type.split(";")[0].strip()
+    if content_type.startswith("text/") and content_type != "text/html":
+        return response.text.strip()
+    return response.extracted_text(
+        f"main-v{EXTRACTOR_VERSION}",
+        lambda: extract_text_from_html(response.content, encoding),
+    )
+
+
+def get_text_from_url(url, session=None):
+    """Scrape and process text from URL."""
     try:
-        encoded_url = quote(url, safe=":/")
-        response = requests.get(
-            encoded_url, allow_redirects=True, timeout=TIMEOUT_SECONDS
-        )
-        return response.status_code < 400
-    except requests.RequestException as e:
-        logging.error("URL validation error: %s", str(e))
+        return text_from_response(fetch_url(url, session))
+    except requests.RequestException:
+        return None
+
+
+def _looks_like_path(source):
+    """Heuristic for inputs meant as file paths (so a typo is reported, not summarized as text)."""
+    if "\n" in source or " " in source.strip():
         return False
+    return os.sep in source or bool(re.fullmatch(r"[^.]+\.[A-Za-z0-9]{1,5}", source))
 
 
-def get_text_from_url(url):
-    """Scrape and process text from URL."""
-    headers = {
-        "User-Agent": get_user_agent(),
-    }
+def resolve_input(source, session=None):
+    """
+    Classify an input once and load its content, making at most one request per URL.
 
-    def fetch_url(fetch_url):
+    Returns a dict with source, kind ('file', 'url' or 'text'), name, content and,
+    if it could not be loaded, error (content is then None).
+    """
+    resolved = {"source": source, "content": None, "error": None}
+    if pathlib.Path(source).exists():
+        resolved.update(kind="file", name=os.path.basename(source))
         try:
-            response = requests.get(
-                fetch_url,
-                allow_redirects=True,
-                timeout=TIMEOUT_SECONDS,
-                headers=headers,
-            )
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, "html.parser")
-                text = soup.get_text()
-                return re.sub(r"[\s\xa0]+", " ", text).strip()
-            return None
-        except requests.RequestException:
-            return None
-
-    # Try fetching the URL directly
-    text = fetch_url(url)
-    return text
+            resolved["content"] = read_input(source)
+        except (OSError, UnicodeDecodeError) as e:
+            resolved["error"] = str(e)
+    elif is_valid_url(source):
+        resolved.update(kind="url", name=source)
+        try:
+            resolved["content"] = text_from_response(fetch_url(source, session))
+        except requests.RequestException as e:
+            resolved["error"] = f"Could not fetch URL: {e}"
+        else:
+            if not resolved["content"]:
+                resolved.update(content=None, error="No text found on the page.")
+    elif _looks_like_path(source):
+        resolved.update(kind="file", name=source, error=f"File {source} does not exist.")
+    else:
+        resolved.update(kind="text", name="text", content=source)
+    return resolved
 
 
 def read_input(input_path):
@@ -145,11 +286,7 @@ def read_input(input_path):
     file_extension = pathlib.Path(input_path).suffix.lower()
     if file_extension == ".pdf":
         try:
-            import fitz
-
-            doc = fitz.open(input_path)
-            text = "".join([page.get_text() for page in doc])
-            return text
+            return read_pdf_text(input_path)
         except ImportError as e:
             logging.error(
                 "Error: PyMuPDF (fitz) is required to read PDF files. "
@@ -163,151 +300,489 @@ def read_input(input_path):
         raise FileNotFoundError("Error: File %s does not exist." % input_path)
 
 
-def generate_response(prompt, model):
-    """Generate a response using the selected model."""
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def chunk_text(text, chunk_tokens=CHUNK_TOKENS):
+    """Split text into chunks of about chunk_tokens, on paragraph and then word boundaries."""
+    limit = chunk_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    size = 0
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph]
+        if len(paragraph) > limit:
+            pieces, piece, piece_size = [], [], 0
+            for word in paragraph.split():
+                piece.append(word)
+                piece_size += len(word) + 1
+                if piece_size >= limit:
+                    pieces.append(" ".join(piece))
+                    piece, piece_size = [], 0
+            if piece:
+                pieces.append(" ".join(piece))
+        for piece in pieces:
+            if current and size + len(piece) > limit:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def embed_texts(texts, model, batch_size=EMBED_BATCH_SIZE):
+    """Embeddings of texts as a float32 array with unit-length rows, one batched request per batch."""
+    import numpy as np
+    import ollama
+
+    vectors = np.vstack([
+        np.asarray(
+            ollama.embed(model=model, input=texts[start:start + batch_size])["embeddings"],
+            dtype=np.float32,
+        )
+        for start in range(0, len(texts), batch_size)
+    ])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def select_context(content, query, budget_tokens, embed_model=DEFAULT_EMBED_MODEL):
+    """
+    Fit content into budget_tokens by keeping the chunks most relevant to the query.
+
+    Chunks are ranked by cosine similarity to the query, packed greedily up to the
+    budget, and returned in document order. Returns (text, coverage), where coverage
+    is None if the content already fits, else a dict with the chunk and token counts
+    kept. If the embedding model is unavailable, the start of the document is kept.
+    """
+    import numpy as np
+
+    total_tokens = estimate_tokens(content)
+    if total_tokens <= budget_tokens:
+        return content, None
+    chunks = chunk_text(content)
+    sizes = np.array([estimate_tokens(chunk) + 1 for chunk in chunks])
+    method = "relevance"
     try:
-        # First measure token count estimate for progress display
-        token_estimate = len(prompt.split()) // 4  # Rough estimate
-
-        print(f"Sending prompt to {model}...")
-
-        # Create a progress spinner while the model works
-        with tqdm(
-            total=None,
-            desc="Model working",
-            bar_format="{desc}: {elapsed}",
-            leave=False,
-        ) as pbar:
-            # Setup progress tracking
-            start_time = time.time()
-
-            # Get response from model
-            response = ollama.chat(
-                model=model,
-                options={"temperature": DEFAULT_TEMP},
-                messages=[{"role": "user", "content": prompt}],
-            )
+        vectors = embed_texts([query] + chunks, embed_model)
+        order = np.argsort(-(vectors[1:] @ vectors[0]), kind="stable")
+    except Exception as e:
+        logging.warning(
+            "Embedding with %s failed (%s); keeping the start of the document instead.",
+            embed_model,
+            str(e),
+        )
+        method = "leading"
+        order = np.arange(len(chunks))
+
+    keep = []
+    used = 0
+    for index in order:
+        if used + sizes[index] <= budget_tokens:
+            keep.append(index)
+            used += sizes[index]
+        elif method == "leading":
+            break
+    keep.sort()
+    coverage = {
+        "method": method,
+        "chunks_kept": len(keep),
+        "chunks_total": len(chunks),
+        "tokens_kept": int(used),
+        "tokens_total": total_tokens,
+    }
+    return "\n\n".join(chunks[index] for index in keep), coverage
 
-            # Update progress bar until complete
-            while (
-                time.time() - start_time < 0.5
-            ):  # Ensure bar displays for at least 0.5s
-                pbar.update(1)
-                time.sleep(0.1)
 
-        # Show completion message
-        response_text = response["message"]["content"]
-        token_count = len(response_text.split())
-        print(f"✓ Response generated: ~{token_count} tokens")
+def format_coverage(coverage):
+    """One-line note of how much of a document a response is based on."""
+    share = coverage["tokens_kept"] / max(coverage["tokens_total"], 1)
+    share = f"{share:.0%}" if share >= 0.01 else "under 1%"
+    basis = "most relevant to the prompt" if coverage["method"] == "relevance" else "from the start"
+    return (
+        f"(Based on {coverage['chunks_kept']} of {coverage['chunks_total']} sections, "
+        f"{share} of the document, {basis}.)"
+    )
 
-        return response_text
-    except Exception as e:
-        logging.error("Failed to generate response: %s", str(e))
-        sys.exit(1)
 
+class PromptUsage:
+    """Thread-safe totals of prompt tokens sent and evaluated, from Ollama's final chunks."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.sent = 0  # Estimated from the prompt size
+        self.evaluated = 0  # prompt_eval_count: tokens not served from Ollama's prompt cache
+
+    def add(self, sent, evaluated):
+        with self.lock:
+            self.requests += 1
+            self.sent += sent
+            self.evaluated += evaluated
+
+    def report(self):
+        if not self.requests:
+            return
+        reused = max(0.0, 1 - self.evaluated / max(self.sent, 1))
+        tqdm.write(
+            f"Prompt tokens evaluated: {self.evaluated} of ~{self.sent} sent over "
+            f"{self.requests} requests (~{reused:.0%} reused from the prompt cache)",
+            file=sys.stderr,
+        )
 
-def process_inputs(base_prompt, inputs, model):
-    """Combine base prompt with content from inputs to generate responses."""
-    responses = []
 
+class ThroughputMeter:
+    """Thread-safe count of streamed tokens, for a live tokens/sec display."""
+
+    def __init__(self, pbar=None):
+        self.pbar = pbar
+        self.tokens = 0
+        self.started = None
+        self.last_refresh = None
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens += 1
+            if self.started is None:
+                # No rate yet: the rate counts the tokens after this one over the time since it
+                self.started = self.last_refresh = now
+                if self.pbar is not None:
+                    self.pbar.set_postfix_str(f"{self.tokens} tokens")
+            elif self.pbar is not None and now - self.last_refresh >= METER_REFRESH_SECONDS:
+                self.last_refresh = now
+                self.pbar.set_postfix_str(
+                    f"{self.tokens} tokens, {(self.tokens - 1) / (now - self.started):.1f} tok/s"
+                )
+
+
+def generate_response(
+    prompt,
+    model,
+    on_token=None,
+    system=None,
+    keep_alive=DEFAULT_KEEP_ALIVE,
+    usage=None,
+    num_ctx=None,
+):
+    """
+    Generate a response using the selected model, streaming it as it is produced.
+
+    With system, that instruction goes first as a system message and prompt follows
+    as the user message, so every request starts with the same prefix and Ollama can
+    reuse its evaluation from the prompt cache. on_token is called once per streamed
+    chunk (for live progress); usage (a PromptUsage) collects prompt_eval_count.
+    num_ctx sets the context size, which otherwise is Ollama's default.
+    Returns the response text, or None on failure.
+    """
+    import ollama
+
+    options = {"temperature": DEFAULT_TEMP}
+    if num_ctx:
+        options["num_ctx"] = num_ctx
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    try:
+        started = time.monotonic()
+        first_token_at = None
+        parts = []
+        final = None
+        for chunk in ollama.chat(
+            model=model,
+            options=options,
+            messages=messages,
+            keep_alive=keep_alive,
+            stream=True,
+        ):
+            content = chunk["message"]["content"]
+            if content:
+                if first_token_at is None:
+                    first_token_at = time.monotonic() - started
+                parts.append(content)
+                if on_token is not None:
+                    on_token()
+            if chunk.get("done"):
+                final = chunk
+
+        response_text = "".join(parts)
+        elapsed = time.monotonic() - started
+        eval_count = (final or {}).get("eval_count") or len(parts)
+        eval_seconds = ((final or {}).get("eval_duration") or 0) / 1e9 or elapsed
+        # Ollama leaves prompt_eval_count out when the whole prompt came from its cache
+        prompt_eval_count = (final or {}).get("prompt_eval_count") or 0
+        if usage is not None:
+            usage.add(sum(estimate_tokens(m["content"]) for m in messages), prompt_eval_count)
+        tqdm.write(
+            f"✓ Response generated: {eval_count} tokens in {elapsed:.1f}s "
+            f"({eval_count / max(eval_seconds, 1e-6):.1f} tok/s, "
+            f"first token after {first_token_at or elapsed:.2f}s, "
+            f"{prompt_eval_count} prompt tokens evaluated)",
+            file=sys.stderr,
+        )
+        return response_text
+    except Exception as e:
+        logging.error("Failed to generate response: %s", str(e))
+        return None
+
+
+def process_inputs(
+    base_prompt,
+    inputs,
+    model,
+    parallel=DEFAULT_PARALLEL,
+    fetch_workers=DEFAULT_FETCH_WORKERS,
+    on_response=None,
+    context_tokens=None,
+    embed_model=DEFAULT_EMBED_MODEL,
+    system_prompt=False,
+    keep_alive=DEFAULT_KEEP_ALIVE,
+):
+    """
+    Combine base prompt with content from inputs to generate responses.
+
+    Inputs are fetched and extracted concurrently on fetch_workers threads, and each
+    one is sent to the model as soon as it is loaded, with at most `parallel` model
+    requests in flight. on_response is called with each response in input order as
+    soon as it and every earlier one are done. Returns all responses in input order,
+    with None for each input that could not be loaded or summarized (logged, and not
+    passed to on_response).
+
+    With context_tokens, inputs that would not fit in that context are cut down to
+    their chunks most relevant to the prompt (see select_context), and each such
+    response ends with a note of how much of the document it covers. Every request
+    then asks Ollama for that context size (num_ctx), so nothing is truncated.
+
+    With system_prompt, the base prompt is sent as a system message ahead of each
+    input instead of being glued to it (see generate_response). Prompt tokens
+    evaluated across all requests are reported at the end.
+    """
     if not inputs:
         # If no inputs, just process the base prompt
-        with tqdm(total=1, desc="Generating response", unit="step") as pbar:
-            response = generate_response(base_prompt, model)
-            pbar.update(1)
-            responses.append(response)
-        return responses
-
-    # For multiple inputs, show overall progress
-    with tqdm(
-        total=len(inputs), desc="Overall progress", unit="input", position=0
-    ) as overall_pbar:
-        for i, input_source in enumerate(inputs):
-            # Determine input type for better description
-            input_type = "URL" if is_valid_url(input_source) else "File"
-            input_name = (
-                os.path.basename(input_source)
-                if not is_valid_url(input_source)
-                else input_source
+        print(f"Sending prompt to {model}...", file=sys.stderr)
+        with tqdm(total=None, desc="Generating response", bar_format="{desc}: {elapsed}{postfix}") as pbar:
+            response = generate_response(
+                base_prompt, model, on_token=ThroughputMeter(pbar), keep_alive=keep_alive
             )
-
-            # Handle different input types
-            with tqdm(
-                total=3,
-                desc=f"Processing {input_type} ({i + 1}/{len(inputs)}): {input_name}",
-                unit="step",
-                position=1,
-                leave=False,
-            ) as pbar:
-                # Step 1: Load content
-                pbar.set_description(f"Loading content from {input_type}")
-                if is_valid_url(input_source):
-                    content = get_text_from_url(input_source)
-                else:
-                    content = read_input(input_source)
-                pbar.update(1)
-
-                # Step 2: Prepare prompt
-                pbar.set_description("Preparing prompt")
+        if response is None:
+            sys.exit(1)
+        if on_response is not None:
+            on_response(response)
+        return [response]
+
+    results = [concurrent.futures.Future() for _ in inputs]
+    usage = PromptUsage()
+    session = requests.Session()  # Reuses connections across URL inputs
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=fetch_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def summarize(index, resolved):
+        try:
+            content, coverage = resolved["content"], None
+            if context_tokens:
+                budget = max(
+                    CHUNK_TOKENS,
+                    context_tokens - RESPONSE_RESERVE_TOKENS - estimate_tokens(base_prompt),
+                )
+                content, coverage = select_context(content, base_prompt, budget, embed_model)
+                if coverage is not None:
+                    tqdm.write(
+                        f"{resolved['name']}: kept {coverage['chunks_kept']}/{coverage['chunks_total']} chunks, "
+                        f"{coverage['tokens_kept']}/{coverage['tokens_total']} tokens",
+                        file=sys.stderr,
+                    )
+            if system_prompt:
+                response = generate_response(
+                    content.strip(),
+                    model,
+                    meter,
+                    system=base_prompt,
+                    keep_alive=keep_alive,
+                    usage=usage,
+                    num_ctx=context_tokens,
+                )
+            else:
                 combined_prompt = f"{base_prompt} {content}".strip()
-                pbar.update(1)
-
-                # Step 3: Generate response with model
-                pbar.set_description(f"Generating response with {model}")
-                response = generate_response(combined_prompt, model)
-                pbar.update(1)
-
-                responses.append(response)
-
-            # Update overall progress
-            overall_pbar.update(1)
+                response = generate_response(
+                    combined_prompt,
+                    model,
+                    meter,
+                    keep_alive=keep_alive,
+                    usage=usage,
+                    num_ctx=context_tokens,
+                )
+            if response is None:
+                logging.error("No response for %s", resolved["source"])
+            elif coverage is not None:
+                response = f"{response}\n\n{format_coverage(coverage)}"
+            results[index].set_result(response)
+        except BaseException as e:
+            results[index].set_exception(e)
+
+    def fetch(index, input_source):
+        try:
+            resolved = resolve_input(input_source, session)
+        except BaseException as e:
+            results[index].set_exception(e)
+            return
+        if resolved["error"]:
+            logging.error("Skipping %s: %s", input_source, resolved["error"])
+            results[index].set_result(None)
+        else:
+            llm_pool.submit(summarize, index, resolved)
 
-            # Add a small separator between input processing
-            if i < len(inputs) - 1:
-                print(f"✓ Completed {input_source}")
+    def completed(index, future):
+        overall_pbar.update(1)
+        if future.exception() is None and future.result() is not None:
+            tqdm.write(f"✓ Completed {inputs[index]}", file=sys.stderr)
 
+    responses = []
+    with tqdm(total=len(inputs), desc="Overall progress", unit="input") as overall_pbar, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as llm_pool, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool:
+        meter = ThroughputMeter(overall_pbar)
+        for index, future in enumerate(results):
+            future.add_done_callback(lambda f, index=index: completed(index, f))
+        try:
+            for index, input_source in enumerate(inputs):
+                fetch_pool.submit(fetch, index, input_source)
+            for future in results:
+                responses.append(future.result())
+                if on_response is not None and responses[-1] is not None:
+                    on_response(responses[-1])
+        except BaseException:
+            # On an error or Ctrl-C only wait for the jobs already running, not the queue
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    usage.report()
     return responses
 
 
-def write_output(output_file, responses):
-    """Write the responses to the output file and/or print to stdout."""
+@contextlib.contextmanager
+def output_writer(output_file):
+    """
+    Yield a function that prints a response and, with output_file, appends it to the
+    file and flushes right away, so finished responses survive a later failure.
+    """
     try:
-        if output_file:
-            with open(output_file, "w", encoding="utf-8") as f:
-                for response in responses:
-                    f.write(response + "\n\n")
-                    print(response + "\n")
-        else:
-            for response in responses:
-                print(response + "\n")
-    except Exception as e:
-        logging.error("Failed to write output: %s", str(e))
+        f = open(output_file, "w", encoding="utf-8") if output_file else None
+    except OSError as e:
+        logging.error("Failed to open output file: %s", str(e))
         sys.exit(1)
 
+    def write(response):
+        print(response + "\n", flush=True)
+        if f is not None:
+            f.write(response + "\n\n")
+            f.flush()
 
-def is_application_open(app_name):
-    """Check if the dependent app is running."""
     try:
-        # Windows
-        if platform.system() == "Windows":
-            output = subprocess.check_output(["tasklist"], text=True)
-        else:  # else assume Unix
-            output = subprocess.check_output(["ps", "aux"], text=True)
-        return any(app_name in line for line in output.splitlines())
-    except subprocess.CalledProcessError as e:
-        logging.warning("Unable to check app status: %s", str(e))
-        return False
+        yield write
+    finally:
+        if f is not None:
+            f.close()
+
+
+def ensure_ollama_running(host):
+    """
+    Make sure the Ollama API is up. On macOS a stopped Ollama app is launched and
+    the API is polled with backoff until it answers, instead of sleeping a fixed time.
+    Elsewhere the API gets READY_WAIT_SECONDS to answer, so one slow probe of a busy
+    or remote server does not end the run.
+    """
+    if ollama_ready(host):
+        return
+    logging.warning("Ollama is not responding at %s", host)
+    if platform.system() != "Darwin":
+        if wait_for_ollama(host, READY_WAIT_SECONDS):
+            return
+        logging.error("Start Ollama (ollama serve) and try again.")
+        sys.exit(1)
+    logging.info("Opening Ollama...")
+    try:
+        subprocess.run(["open", "-a", "Ollama"], check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        logging.error("Failed to open Ollama: %s", str(e))
+        sys.exit(1)
+    if not wait_for_ollama(host, STARTUP_WAIT_SECONDS):
+        logging.error("Ollama did not start within %d seconds.", STARTUP_WAIT_SECONDS)
+        sys.exit(1)
+
+
+def wait_for_ollama(host, timeout):
+    """Poll the Ollama API with exponential backoff until it answers; False after timeout."""
+    delay, max_delay = PROBE_BACKOFF_SECONDS
+    deadline = time.monotonic() + timeout
+    while not ollama_ready(host):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+    return True
+
+
+def preload_model(host, model, keep_alive=DEFAULT_KEEP_ALIVE, num_ctx=None):
+    """
+    Ask Ollama to load the model in a background thread (a generate request with no
+    prompt only loads it), so the load overlaps with fetching and extracting inputs.
+    num_ctx must match the chat requests, or Ollama reloads the model for them.
+    """
+    body = {"model": model, "keep_alive": keep_alive}
+    if num_ctx:
+        body["options"] = {"num_ctx": num_ctx}
+
+    def load():
+        started = time.monotonic()
+        try:
+            requests.post(
+                f"{host}/api/generate",
+                json=body,
+                timeout=PRELOAD_TIMEOUT_SECONDS,
+            ).raise_for_status()
+            logging.debug("Model %s ready after %.1fs", model, time.monotonic() - started)
+        except requests.RequestException as e:
+            logging.debug("Model preload failed: %s", str(e))
+
+    thread = threading.Thread(target=load, name="preload-model", daemon=True)
+    thread.start()
+    return thread
 
 
 def main():
     """Main function."""
     try:
         base_prompt = args.prompt or DEFAULT_PROMPT
-        responses = process_inputs(base_prompt, args.inputs, args.model)
-        write_output(args.output, responses)
+        with output_writer(args.output) as write:
+            responses = process_inputs(
+                base_prompt,
+                args.inputs,
+                args.model,
+                parallel=args.parallel,
+                fetch_workers=args.fetch_workers,
+                on_response=write,
+                context_tokens=args.context_tokens if args.retrieve else None,
+                embed_model=args.embed_model,
+                system_prompt=args.system_prompt,
+                keep_alive=args.keep_alive,
+            )
     except Exception as e:
         logging.error("An error occurred: %s", str(e))
         sys.exit(1)
+    failures = responses.count(None)
+    if failures:
+        logging.error("%d of %d inputs failed", failures, len(responses))
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -316,34 +791,75 @@ if __name__ == "__main__":
     parser.add_argument(
         "-i", "--inputs", nargs="*", help="Paths to input files or URLs", default=[]
     )
-
-    # Get available models dynamically
-    available_models = get_available_models()
-
     parser.add_argument(
         "-m",
         "--model",
-        choices=available_models,
-        help="Model to use",
-        default=DEFAULT_MODEL
-        if DEFAULT_MODEL in available_models
-        else available_models[0]
-        if available_models
-        else None,
+        help="Model to use (see --list-models)",
+        default=os.environ.get("OLLAMA_MODEL", DEFAULT_MODEL),
+    )
+    parser.add_argument(
+        "--list-models", action="store_true", help="List available models and exit"
     )
     parser.add_argument("-o", "--output", help="Output file", default=None)
     parser.add_argument("-t", "--temperature", help="Temperature", default=DEFAULT_TEMP)
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=DEFAULT_PARALLEL,
+        help="Concurrent model requests (match OLLAMA_NUM_PARALLEL)",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=DEFAULT_FETCH_WORKERS,
+        help="Inputs fetched and extracted concurrently",
+    )
+    parser.add_argument(
+        "--retrieve",
+        action="store_true",
+        help="For inputs larger than the context, send only the chunks most relevant to the prompt",
+    )
+    parser.add_argument(
+        "--context-tokens",
+        type=int,
+        default=DEFAULT_CONTEXT_TOKENS,
+        help="Model context size used by --retrieve (default: $OLLAMA_CONTEXT_LENGTH or %(default)s)",
+    )
+    parser.add_argument(
+        "--embed-model",
+        default=DEFAULT_EMBED_MODEL,
+        help="Embedding model used by --retrieve (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--system-prompt",
+        action="store_true",
+        help="Send the prompt as a system message ahead of each input, so Ollama can reuse its evaluation",
+    )
+    parser.add_argument(
+        "--keep-alive",
+        default=DEFAULT_KEEP_ALIVE,
+        help="How long Ollama keeps the model loaded after each request (default: $OLLAMA_KEEP_ALIVE or %(default)s)",
+    )
     args = parser.parse_args()
-
-    app_name = "Ollama"
-    if not is_application_open(app_name):
-        logging.warning("%s not running", app_name)
-        if platform.system() == "Darwin":
-            logging.info("Opening %s...", app_name)
-            try:
-                subprocess.run(["open", "-a", app_name], check=True)
-                sleep(5)  # Giving it a little time to start
-            except subprocess.CalledProcessError as e:
-                logging.error("Failed to open %s: %s", app_name, str(e))
-                sys.exit(1)
+    if args.parallel <= 0 or args.fetch_workers <= 0:
+        parser.error("--parallel and --fetch-workers must be positive")
+    if args.retrieve and args.context_tokens <= RESPONSE_RESERVE_TOKENS:
+        parser.error(f"--context-tokens must be more than {RESPONSE_RESERVE_TOKENS}")
+
+    host = get_ollama_host()
+    ensure_ollama_running(host)
+
+    if args.list_models:
+        models = get_available_models(host, refresh=True)
+        print("\n".join(models or []))
+        sys.exit(0 if models is not None else 1)
+
+    validate_model(args.model, host)
+    if args.inputs:
+        # With no inputs the chat request follows immediately, so there is nothing to overlap
+        preload_model(
+            host, args.model, args.keep_alive, args.context_tokens if args.retrieve else None
+        )
+    if sys.version_info >= (3, 12):
+        os.system("cls" if os.name == "nt" else "clear")  # Clear the terminal screen
     main()
@@ -0,0 +1,141 @@
+"""
+PDF text extraction shared by the summarizer scripts.
+
+Pages are extracted with PyMuPDF in a pool of worker processes (PyMuPDF is not thread
+safe), one page range per task, and yielded in page order as soon as each range is done,
+so a caller can start chunking while later pages are still being extracted. The first
+range is extracted in-process while the workers start. Small
+documents are extracted in-process, where starting a pool would cost more than it saves.
+
+Extracted pages are cached on disk, keyed by the file's resolved path, size and
+modification time, so repeat runs over the same PDF skip PyMuPDF entirely. The cache
+lives in $PDF_TEXT_CACHE_DIR, or $XDG_CACHE_HOME/pdf_text (~/.cache/pdf_text).
+
+    from pdf_extract import iter_pdf_pages, read_pdf_text
+    for page in iter_pdf_pages("report.pdf"):
+        ...
+    text = read_pdf_text("report.pdf")
+"""
+
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+
+PAGES_PER_TASK = 16  # Page range handed to one worker
+PARALLEL_MIN_PAGES = 48  # Below this a process pool costs more than it saves
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)
+CACHE_VERSION = 1  # Bump when the extraction output changes
+CACHE_DIR = os.environ.get("PDF_TEXT_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "pdf_text",
+)
+
+
+def _open(path):
+    try:
+        import pymupdf
+    except ImportError:  # PyMuPDF before 1.24.3 only ships the fitz name
+        import fitz as pymupdf
+    return pymupdf.open(path)
+
+
+def _extract_range(path, start, stop):
+    """Worker: text of pages [start, stop) of the PDF at path."""
+    with _open(path) as doc:
+        return [doc[number].get_text() for number in range(start, stop)]
+
+
+def cache_path(path, cache_dir=None):
+    """Cache file for a PDF, or None if the file cannot be stat'ed."""
+    try:
+        real = os.path.realpath(path)
+        stat = os.stat(real)
+    except OSError:
+        return None
+    key = json.dumps([CACHE_VERSION, real, stat.st_size, stat.st_mtime_ns])
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir or CACHE_DIR, f"{digest}.json.gz")
+
+
+def _read_cache(path):
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path, pages):
+    """Atomically store extracted pages; a failed write only costs the next run a re-extract."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(pages, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def _extract_pages(path, workers):
+    """Yield page texts in order, extracting ranges in parallel for large documents."""
+    with _open(path) as doc:
+        page_count = doc.page_count
+        if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+            for page in doc:
+                yield page.get_text()
+            return
+
+        ranges = [(start, min(start + PAGES_PER_TASK, page_count))
+                  for start in range(PAGES_PER_TASK, page_count, PAGES_PER_TASK)]
+        # Callers run this from threads; forking a threaded process is unsafe, so use spawn
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(workers, len(ranges)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        try:
+            futures = [pool.submit(_extract_range, path, start, stop) for start, stop in ranges]
+            # The first range is extracted here while the workers start up
+            for number in range(PAGES_PER_TASK):
+                yield doc[number].get_text()
+            for future in futures:
+                yield from future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf_pages(path, workers=DEFAULT_WORKERS, use_cache=True):
+    """
+    Yield the text of each page of a PDF, in order.
+
+    Served from the cache when the file is unchanged since it was last extracted; the
+    cache is written only once every page has been extracted.
+    """
+    cached = cache_path(path) if use_cache else None
+    if cached:
+        pages = _read_cache(cached)
+        if pages is not None:
+            yield from pages
+            return
+
+    pages = []
+    for page in _extract_pages(path, workers):
+        pages.append(page)
+        yield page
+    if cached:
+        _write_cache(cached, pages)
+
+
+def read_pdf_text(path, workers=DEFAULT_WORKERS, use_cache=True):
+    """All text of a PDF as one string."""
+    return "".join(iter_pdf_pages(path, workers, use_cache))
@@ -1,6 +1,6 @@
 #!/usr/bin/env -S uv run --script
 # /// script
-# dependencies = ["requests", "youtube_transcript_api"]
+# dependencies = ["filelock", "numpy", "requests", "youtube_transcript_api"]
 # ///
 
 """
@@ -19,6 +19,13 @@ Features:
 - Structured output with paragraph, sentence, question, and concise answer formats
 - Wikipedia search term generation
 - Result caching for faster repeat queries
+- Compressed local transcript store (raw segments with timings)
+- Transcript normalization (caption markers, rolling repeats, fillers) to cut prompt tokens
+- Map-reduce chunking so long videos fit the model context
+- Per-step model routing (e.g. a small model for the short answers)
+- Batch/playlist mode that overlaps transcript fetching with summarization
+- Server mode with a warm model, a bounded job queue and in-flight deduplication
+- Semantic search over past summaries and transcripts (embedding index, updated on write)
 - Command-line interface with various options
 
 Original concept inspired by Stanley Tong's (stong) TLDW:
@@ -30,13 +37,41 @@ and offline capability.
 
 Usage (first make executable with chmod +x tldw.py):
   ./tldw.py [YouTube URL] [options]
+  ./tldw.py URL1 URL2 ... [options]        # batch mode, JSONL output
+  ./tldw.py -i urls.txt -o results.jsonl   # URLs from a file ('-' for stdin)
+  ./tldw.py serve [--port 8765 | --socket PATH]  # long-running HTTP API
+  ./tldw.py search "query" [-k 10] [--reindex]   # semantic search over past videos
 
 Options:
+  -i, --input-file   Read URLs (videos or playlists) from a file or stdin
+  --jsonl            Emit JSONL records even for a single URL
+  --fetch-workers    Concurrent transcript fetches in batch mode
   -o, --output       Output file path for saving results
   -t, --transcript-only  Only fetch and print the transcript
   --model            Specify Ollama model to use
   --host             Specify Ollama host URL
   --no-cache         Force regeneration, ignore existing cache
+  --temperature      Generation temperature (default 0.0)
+  --cache-max-mb     Size cap for the summary cache (LRU eviction)
+  --cache-max-age-days  Drop cached summaries unused for this long
+  --cache-stats      Print cache hit/miss statistics and exit
+  --language         Transcript language code (default: en)
+  --refresh-transcript  Refetch the transcript instead of using the stored copy
+  --raw-transcript   Skip transcript normalization and send captions verbatim
+  --chunk-tokens     Token budget per transcript chunk for long videos
+  --chunk-overlap    Tokens of overlap carried between adjacent chunks
+  --parallel         Concurrent Ollama requests (match OLLAMA_NUM_PARALLEL)
+  --single-shot      Request all summary fields at once as schema-constrained JSON
+  --stream           Stream tokens as they are generated and report time-to-first-token
+  --short-model      Smaller model for the sentence/question/answer/term steps
+  --step-model       Route one step to a model, e.g. --step-model answer=llama3.2:1b
+  --embed-model      Embedding model for the search index (default: nomic-embed-text)
+  --no-index         Do not index new summaries for 'search'
+  --num-ctx          Fixed context window (default: sized per request)
+  --keep-alive       How long Ollama keeps the model loaded (e.g. 30m)
+  --profile          Per-step timing breakdown (load / prompt eval / generation)
+  --profile-output   Write the profile as JSON
+  --metrics-log      Append profile records to a JSONL metrics log
 
 Requirements:
   - Ollama (https://ollama.com) running locally
@@ -45,20 +80,31 @@ Requirements:
 
 
 TODO:
-    - implement chunking for long videos
     - better output parsing
-    - temperature override flag
     - fetch video metadata for better grounding
 """
 
 import argparse
+import concurrent.futures
+import contextlib
+import gzip
+import hashlib
 import os
+import sqlite3
 import sys
+import tempfile
+import threading
+import time
 import requests
 import json
-from urllib.parse import quote_plus
+import re
+import socket
+import stat
+from filelock import FileLock, Timeout
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote_plus, urlparse
 from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter
 
 # --- Configuration ---
 DEFAULT_OLLAMA_HOST = "http://localhost:11434"
@@ -66,6 +112,51 @@ DEFAULT_OLLAMA_HOST = "http://localhost:11434"
 DEFAULT_OLLAMA_MODEL = "mistral-nemo:latest"
 DEFAULT_TEMPERATURE = 0.0 # Default temperature for deterministic output
 
+# Long transcripts are split into chunks of roughly this many tokens, summarized
+# concurrently and reduced before the structured steps run.
+DEFAULT_CHUNK_TOKENS = 6000
+DEFAULT_CHUNK_OVERLAP = 200
+CHARS_PER_TOKEN = 4 # Rough average for English text
+MAX_REDUCE_LEVELS = 8 # Safety net for the reduce tree
+# Chunk boundaries are content-defined so they stay put when captions are edited elsewhere:
+# once a chunk is CHUNK_MIN_FILL full, it ends after the next line whose hash is 0 mod
+# CHUNK_ANCHOR_MODULUS (or when the budget is hit).
+CHUNK_MIN_FILL = 0.75
+CHUNK_ANCHOR_MODULUS = 8
+
+# Transcripts are normalized before summarization (see normalize_segments); --raw-transcript skips it
+NORMALIZE_LINE_WORDS = 40 # Line length used when captions carry no sentence punctuation
+NORMALIZE_MIN_OVERLAP = 2 # Shortest partial-line repeat treated as a rolling caption overlap
+NORMALIZE_MAX_OVERLAP = 40
+FILLER_WORDS = frozenset({"um", "umm", "uh", "uhh", "uhm", "erm", "er", "ah", "hmm", "mm", "mhm"})
+CLAUSE_OPENERS = frozenset({"so", "but", "because", "which", "another", "anyway", "okay"})
+
+# num_ctx is sized per request from the estimated prompt length (see size_context_window)
+MIN_NUM_CTX = 2048
+RESPONSE_TOKEN_RESERVE = 1024 # Room left in the window for the model's answer
+MESSAGE_TOKEN_OVERHEAD = 4 # Chat template tokens added around each message
+
+
+def _env_int(name, default):
+    """Reads a positive integer from the environment, falling back to default."""
+    try:
+        value = int(os.environ.get(name, ""))
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+# Ollama serves this many requests per model concurrently (its own default is 4 when memory allows).
+DEFAULT_PARALLEL = _env_int('OLLAMA_NUM_PARALLEL', 4)
+# Transcript fetches are network-bound, so batch mode runs more of them than model calls
+DEFAULT_FETCH_WORKERS = 8
+
+# Server mode ('tldw.py serve')
+DEFAULT_SERVE_BIND = "127.0.0.1"
+DEFAULT_SERVE_PORT = 8765
+DEFAULT_SERVE_MAX_QUEUE = 100
+DEFAULT_SERVE_KEEP_ALIVE = "30m" # Keep the model resident between requests
+
 # Determine script directory and set cache directory within it
 try:
     # Get the absolute path of the directory containing the script
@@ -75,9 +166,34 @@ except NameError:
     SCRIPT_DIR = os.path.abspath(os.getcwd())
     print(f"Warning: __file__ not defined. Using current working directory for cache: {SCRIPT_DIR}", file=sys.stderr)
 
-# Use a specific subdirectory name within the script's directory for the cache
+# Use a specific subdirectory name within the script's directory for the cache (or set TLDW_CACHE_DIR)
 CACHE_SUBDIR = ".tldw_cache"
-CACHE_DIR = os.path.join(SCRIPT_DIR, CACHE_SUBDIR)
+CACHE_DIR = os.environ.get('TLDW_CACHE_DIR') or os.path.join(SCRIPT_DIR, CACHE_SUBDIR)
+# Raw transcript segments are kept under CACHE_DIR so re-summarizing needs no network I/O
+TRANSCRIPT_SUBDIR = "transcripts"
+DEFAULT_LANGUAGE = "en"
+# Summaries are content-addressed files indexed in SQLite, with LRU eviction
+SUMMARY_SUBDIR = "summaries"
+# Per-key lock files, so concurrent processes never generate (or fetch) the same thing twice
+LOCK_SUBDIR = "locks"
+LOCK_TIMEOUT_S = 1800 # Give up waiting for another process after this long and do the work anyway
+CACHE_INDEX_FILE = "index.sqlite3"
+DEFAULT_CACHE_MAX_MB = 200
+DEFAULT_CACHE_MAX_AGE_DAYS = 90
+# Semantic search ('tldw.py search'): embeddings of summaries and transcript windows
+SEARCH_SUBDIR = "search"
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+SEARCH_CHUNK_TOKENS = 200 # Transcript window size per indexed passage
+SEARCH_EMBED_BATCH = 64 # Texts per embedding request
+SEARCH_SPARE_CANDIDATES = 20
+# Part of every summary cache key; bump whenever any prompt text changes
+PROMPT_VERSION = 2
+
+# Bounds in-flight Ollama requests across all worker threads; see set_llm_parallelism().
+_LLM_SLOTS = threading.BoundedSemaphore(DEFAULT_PARALLEL)
+
+class TranscriptUnavailableError(Exception):
+    """Raised when no usable transcript can be retrieved for a video."""
 
 # --- Helper Functions ---
 
@@ -88,6 +204,40 @@ def ensure_cache_dir():
     except OSError as e:
         print(f"Warning: Could not create cache directory {CACHE_DIR}: {e}", file=sys.stderr)
 
+@contextlib.contextmanager
+def key_lock(lock_path, waiting_for, stats=None, timeout=LOCK_TIMEOUT_S):
+    """
+    Holds an inter-process file lock for one cache key. If another process holds it, prints
+    that we are waiting, records the wait in stats['lock_wait_s'] and yields True once the
+    lock is ours, so the caller can re-check the cache; yields False if there was no wait.
+    After timeout the work proceeds without the lock.
+    """
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    lock = FileLock(lock_path)
+    waited = False
+    try:
+        lock.acquire(timeout=0)
+    except Timeout:
+        print(f"Waiting for another process {waiting_for}...")
+        started = time.perf_counter()
+        waited = True
+        try:
+            lock.acquire(timeout=timeout)
+        except Timeout:
+            print(f"Warning: Still locked after {timeout}s ({lock_path}); continuing without the lock.", file=sys.stderr)
+        if stats is not None:
+            stats['lock_wait_s'] = round(time.perf_counter() - started, 4)
+    try:
+        yield waited
+    finally:
+        if lock.is_locked:
+            lock.release()
+
+def set_llm_parallelism(parallel):
+    """Sets how many Ollama requests may be in flight at once."""
+    global _LLM_SLOTS
+    _LLM_SLOTS = threading.BoundedSemaphore(max(1, parallel))
+
 def get_video_id(url):
     """Extracts the YouTube video ID from various URL formats."""
     if "youtu.be/" in url:
@@ -101,8 +251,11 @@ def get_video_id(url):
     # Add more patterns if needed
     raise ValueError(f"Cannot parse YouTube Video ID from URL: {url}")
 
-def get_transcript(video_id):
-    """Fetches and formats the transcript using the instance-based API."""
+def fetch_transcript_record(video_id, language=DEFAULT_LANGUAGE):
+    """
+    Fetches the transcript segments from YouTube using the instance-based API.
+    Raises TranscriptUnavailableError if no suitable transcript exists.
+    """
     print(f"Fetching transcript for video ID: {video_id} ...")
 
     # Instantiate the API class
@@ -116,22 +269,22 @@ def get_transcript(video_id):
         print(f"\nError: Could not retrieve transcript list for video ID {video_id}.", file=sys.stderr)
         print("This could be due to the video being private, having disabled transcripts, or other API issues.", file=sys.stderr)
         print(f"Details from API: {e}", file=sys.stderr)
-        sys.exit(1)
+        raise TranscriptUnavailableError(f"Could not retrieve transcript list for video ID {video_id}") from e
 
     # Now that we have the list, we can safely search it.
     try:
-        # Try for a manually created English transcript first.
-        transcript = transcript_list.find_manually_created_transcript(['en'])
-        print("Using manual English transcript.")
+        # Try for a manually created transcript first.
+        transcript = transcript_list.find_manually_created_transcript([language])
+        print(f"Using manual '{language}' transcript.")
     except Exception:
-        # If manual fails, try for an auto-generated English transcript.
+        # If manual fails, try for an auto-generated transcript.
         try:
-            print("Manual English transcript not found or failed, trying generated English...")
-            transcript = transcript_list.find_generated_transcript(['en'])
-            print("Using generated English transcript.")
+            print(f"Manual '{language}' transcript not found or failed, trying generated '{language}'...")
+            transcript = transcript_list.find_generated_transcript([language])
+            print(f"Using generated '{language}' transcript.")
         except Exception as e:
-            # If both manual and generated English fail, report the issue and list available languages.
-            print(f"\nError: Could not find a suitable English transcript for video ID {video_id}.", file=sys.stderr)
+            # If both manual and generated fail, report the issue and list available languages.
+            print(f"\nError: Could not find a suitable '{language}' transcript for video ID {video_id}.", file=sys.stderr)
             print(f"Details: {e}", file=sys.stderr)
             try:
                 # List available languages from the already fetched transcript_list.
@@ -139,33 +292,357 @@ def get_transcript(video_id):
                 print(f"Available transcript language codes are: {langs}", file=sys.stderr)
             except Exception:
                 print("Could not list available languages from the retrieved list.", file=sys.stderr)
-            sys.exit(1)
+            raise TranscriptUnavailableError(f"Could not find a suitable '{language}' transcript for video ID {video_id}") from e
+
+    # If we successfully found a transcript, keep its raw segments (text, start, duration).
+    fetched = transcript.fetch()
+    raw_segments = fetched.to_raw_data() if hasattr(fetched, 'to_raw_data') else list(fetched)
+    return {
+        "video_id": video_id,
+        "language": language,
+        "language_code": getattr(transcript, 'language_code', language),
+        "is_generated": bool(getattr(transcript, 'is_generated', False)),
+        "fetched_at": time.time(),
+        "segments": [
+            {"text": segment['text'], "start": float(segment['start']), "duration": float(segment['duration'])}
+            for segment in raw_segments
+        ],
+    }
+
+# --- Transcript Store ---
+
+def _transcript_store_path(video_id, language):
+    return os.path.join(CACHE_DIR, TRANSCRIPT_SUBDIR, f"{video_id}.{language}.json.gz")
+
+def load_transcript_record(video_id, language=DEFAULT_LANGUAGE):
+    """Returns the stored transcript record for (video_id, language), or None if absent or unreadable."""
+    store_path = _transcript_store_path(video_id, language)
+    if not os.path.isfile(store_path):
+        return None
+    try:
+        with gzip.open(store_path, 'rt', encoding='utf-8') as f:
+            record = json.load(f)
+        if not isinstance(record.get('segments'), list):
+            raise ValueError("missing segments")
+        return record
+    except (OSError, EOFError, ValueError, UnicodeDecodeError) as e:
+        print(f"Warning: Could not read stored transcript {store_path}: {e}. Refetching.", file=sys.stderr)
+        return None
+
+def save_transcript_record(record):
+    """Writes a transcript record to the gzip-compressed store, replacing any previous copy."""
+    store_path = _transcript_store_path(record['video_id'], record['language'])
+    temp_path = None
+    try:
+        os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(store_path), prefix=f".{os.path.basename(store_path)}.", suffix=".tmp")
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, store_path)
+    except OSError as e:
+        print(f"Warning: Could not write transcript store {store_path}: {e}", file=sys.stderr)
+        try:
+            if temp_path:
+                os.remove(temp_path)
+        except OSError:
+            pass
+
+def segments_to_text(segments):
+    """Joins segment texts one per line, matching youtube_transcript_api's TextFormatter."""
+    return "\n".join(segment['text'] for segment in segments)
+
+def slice_segments(segments, start=None, end=None):
+    """Returns the segments overlapping the [start, end) window, in seconds. None leaves a side open."""
+    return [
+        segment for segment in segments
+        if (start is None or segment['start'] + segment['duration'] > start)
+        and (end is None or segment['start'] < end)
+    ]
+
+def get_transcript_record(video_id, language=DEFAULT_LANGUAGE, refresh=False, stats=None):
+    """
+    Returns the transcript record (segments with start/duration plus metadata), serving it
+    from the local store when present and fetching and storing it otherwise. If a stats
+    dict is given it receives source ('store' or 'youtube') and fetch_s.
+    """
+    if stats is None:
+        stats = {}
+    started = time.perf_counter()
+    if not refresh:
+        record = load_transcript_record(video_id, language)
+        if record is not None:
+            print(f"Using stored transcript: {_transcript_store_path(video_id, language)}")
+            stats.update(source='store', fetch_s=round(time.perf_counter() - started, 4))
+            return record
+    lock_path = os.path.join(CACHE_DIR, LOCK_SUBDIR, f"transcript-{video_id}.{language}.lock")
+    with key_lock(lock_path, f"to fetch the transcript for {video_id}", stats) as waited:
+        record = load_transcript_record(video_id, language) if waited else None
+        if record is not None:
+            stats.update(source='store', fetch_s=round(time.perf_counter() - started, 4))
+            return record
+        record = fetch_transcript_record(video_id, language)
+        save_transcript_record(record)
+    stats.update(source='youtube', fetch_s=round(time.perf_counter() - started, 4))
+    return record
+
+def get_transcript(video_id, language=DEFAULT_LANGUAGE, refresh=False, stats=None, normalize=True):
+    """
+    Returns the transcript as plain text. By default it is normalized for the model (see
+    normalize_segments); normalize=False gives the raw captions, one caption line per line.
+    If a stats dict is given it also receives tokens_raw, tokens_est and token_ratio.
+    """
+    record = get_transcript_record(video_id, language, refresh, stats)
+    segments = record['segments']
+    raw_text = segments_to_text(segments)
+    transcript_text = normalize_segments(segments, record.get('is_generated', False)) if normalize else raw_text
+    tokens_raw, tokens_est = estimate_tokens(raw_text), estimate_tokens(transcript_text)
+    if normalize and tokens_raw:
+        print(f"Normalized transcript: ~{tokens_raw} -> ~{tokens_est} tokens ({1 - tokens_est / tokens_raw:.0%} fewer)")
+    if stats is not None:
+        stats.update(tokens_raw=tokens_raw, tokens_est=tokens_est,
+                     token_ratio=round(tokens_est / tokens_raw, 4) if tokens_raw else 1.0)
+    return transcript_text
+
+
+# --- Transcript Normalization ---
+
+# Non-speech caption markers: [Music], [Applause], (laughter), music notes, '>>' speaker changes
+_CAPTION_MARKER_RE = re.compile(
+    r"\[[^\]]*\]|\((?:[^)]*\b(?:music|applause|laughter|laughs|inaudible|silence)\b[^)]*)\)|[♪♫]+|>>+",
+    re.IGNORECASE,
+)
+_WORD_KEY_RE = re.compile(r"[^\w']+")
+_SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*$")
+
+def _word_key(word):
+    """Comparison form of a caption word: lowercase, surrounding punctuation removed."""
+    return _WORD_KEY_RE.sub("", word.lower())
+
+def _caption_overlap(previous_keys, new_keys):
+    """
+    Returns how many leading words of a caption line repeat the end of the text so far.
+    Auto-generated captions roll: each line starts with the previous line's words.
+    Overlaps shorter than NORMALIZE_MIN_OVERLAP words only count if they cover the whole line.
+    """
+    longest = min(len(previous_keys), len(new_keys), NORMALIZE_MAX_OVERLAP)
+    for size in range(longest, 0, -1):
+        if size < NORMALIZE_MIN_OVERLAP and size < len(new_keys):
+            break
+        if previous_keys[-size:] == new_keys[:size]:
+            return size
+    return 0
+
+def _collapse_disfluencies(words):
+    """Drops filler words and immediate stutters ('the the', 'I I I')."""
+    cleaned = []
+    for word in words:
+        key = _word_key(word)
+        if key in FILLER_WORDS:
+            continue
+        if cleaned and key and key == _word_key(cleaned[-1]) and not _SENTENCE_END_RE.search(cleaned[-1]):
+            continue
+        cleaned.append(word)
+    return cleaned
+
+def _resegment(words):
+    """
+    Rebuilds lines from a word stream: one sentence per line where the captions are punctuated.
+    Unpunctuated (auto-generated) text is broken before a clause opener like 'so' or 'but' once
+    a line is half of NORMALIZE_LINE_WORDS long, and at NORMALIZE_LINE_WORDS regardless.
+    Downstream chunking splits on lines.
+    """
+    lines, current = [], []
+    for word in words:
+        if len(current) >= NORMALIZE_LINE_WORDS // 2 and _word_key(word) in CLAUSE_OPENERS:
+            lines.append(" ".join(current))
+            current = []
+        current.append(word)
+        if _SENTENCE_END_RE.search(word) or len(current) >= NORMALIZE_LINE_WORDS:
+            lines.append(" ".join(current))
+            current = []
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+def normalize_segments(segments, is_generated=False):
+    """
+    Turns raw caption segments into compact prompt text: strips non-speech markers, removes the
+    repeated words of rolling captions (is_generated only; in manual captions a repeat is speech),
+    drops fillers and stutters, and rejoins sentences that were split across caption lines.
+    """
+    words, keys = [], []
+    for segment in segments:
+        for line in segment['text'].splitlines():
+            line_words = _CAPTION_MARKER_RE.sub(" ", line).split()
+            line_keys = [_word_key(word) for word in line_words]
+            skip = _caption_overlap(keys, line_keys) if is_generated else 0
+            words.extend(line_words[skip:])
+            keys.extend(line_keys[skip:])
+    return "\n".join(_resegment(_collapse_disfluencies(words)))
+
+
+# --- Context Window Sizing ---
+
+_MODEL_CONTEXT_LENGTHS = {}
+_MODEL_CONTEXT_LOCK = threading.Lock()
+_NUM_CTX_OVERRIDE = None
+_KEEP_ALIVE = None
+
+def set_keep_alive(keep_alive):
+    """Sets Ollama's keep_alive for every request (e.g. '30m'); None leaves the server default."""
+    global _KEEP_ALIVE
+    _KEEP_ALIVE = keep_alive or None
+
+def set_context_window(num_ctx):
+    """Pins num_ctx for every request (None or 0 restores automatic sizing)."""
+    global _NUM_CTX_OVERRIDE
+    _NUM_CTX_OVERRIDE = num_ctx or None
+
+def get_model_context_length(model_name, host_url):
+    """
+    Returns the model's maximum context length as reported by /api/show, or None if it
+    cannot be determined. Looked up once per (host, model) and remembered.
+    """
+    cache_key = (host_url.rstrip('/'), model_name)
+    with _MODEL_CONTEXT_LOCK:
+        if cache_key in _MODEL_CONTEXT_LENGTHS:
+            return _MODEL_CONTEXT_LENGTHS[cache_key]
+        context_length = None
+        try:
+            response = requests.post(f"{cache_key[0]}/api/show", json={"model": model_name}, timeout=10)
+            response.raise_for_status()
+            model_info = response.json().get('model_info') or {}
+            for key, value in model_info.items():
+                if key.endswith('.context_length') and isinstance(value, int):
+                    context_length = value
+                    break
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Warning: Could not read context length for {model_name}: {e}", file=sys.stderr)
+        _MODEL_CONTEXT_LENGTHS[cache_key] = context_length
+        return context_length
 
-    # If we successfully found a transcript, format and return it.
-    formatter = TextFormatter()
-    full_transcript = formatter.format_transcript(transcript.fetch())
-    return full_transcript
+def estimate_message_tokens(messages):
+    """Estimated prompt tokens for a chat history, including a small per-message template overhead."""
+    return sum(estimate_tokens(message.get('content', '')) + MESSAGE_TOKEN_OVERHEAD for message in messages)
+
+def size_context_window(messages, model_name, host_url, stats=None):
+    """
+    Picks num_ctx for a request: the estimated prompt plus RESPONSE_TOKEN_RESERVE, rounded up
+    to a power of two and capped at the model's maximum. Rounding keeps the number of distinct
+    window sizes small, since Ollama reloads the model whenever num_ctx changes. Warns when the
+    prompt will not fit and Ollama is going to truncate it.
+    """
+    prompt_tokens = estimate_message_tokens(messages)
+    if stats is not None:
+        stats['prompt_tokens_est'] = prompt_tokens
+    if _NUM_CTX_OVERRIDE:
+        return _NUM_CTX_OVERRIDE
+
+    needed = prompt_tokens + RESPONSE_TOKEN_RESERVE
+    num_ctx = MIN_NUM_CTX
+    while num_ctx < needed:
+        num_ctx *= 2
+
+    max_ctx = get_model_context_length(model_name, host_url)
+    if max_ctx and num_ctx > max_ctx:
+        num_ctx = max_ctx
+        if needed > max_ctx:
+            print(f"Warning: Prompt is ~{prompt_tokens} tokens but {model_name} has a {max_ctx}-token context; "
+                  f"Ollama will truncate it. Lower --chunk-tokens to avoid this.", file=sys.stderr)
+            if stats is not None:
+                stats['truncated'] = True
+    return num_ctx
+
+def _read_ndjson_stream(response, on_token, stats, started):
+    """
+    Consumes Ollama's streamed NDJSON chunks line by line, passing each content piece to
+    on_token as it arrives. Returns the assembled content and the final ('done') chunk.
+    """
+    pieces = []
+    final_chunk = {}
+    # chunk_size=None yields data as each HTTP chunk arrives instead of waiting for a full buffer
+    for line in response.iter_lines(chunk_size=None):
+        if not line:
+            continue
+        chunk = json.loads(line)
+        if 'error' in chunk:
+            raise requests.exceptions.RequestException(f"Ollama stream error: {chunk['error']}")
+        piece = chunk.get('message', {}).get('content') or chunk.get('response') or ""
+        if piece:
+            if 'ttft_s' not in stats:
+                stats['ttft_s'] = time.perf_counter() - started
+            pieces.append(piece)
+            if on_token:
+                on_token(piece)
+        if chunk.get('done'):
+            final_chunk = chunk
+            break
+    stats['stream_chunks'] = len(pieces)
+    return "".join(pieces), final_chunk
 
-def _ollama_chat_completion(messages, model_name, host_url, timeout=180, temperature=DEFAULT_TEMPERATURE):
-    """Sends a full message history to the Ollama chat endpoint with temperature control."""
+def _record_generation_rate(stats, response_data, started):
+    """Fills tokens/sec into stats, preferring Ollama's own eval counters over wall-clock time."""
+    eval_count = response_data.get('eval_count')
+    eval_duration = response_data.get('eval_duration')
+    if eval_count and eval_duration:
+        stats['tokens_per_s'] = eval_count / (eval_duration / 1e9)
+    elif stats.get('stream_chunks') and 'ttft_s' in stats:
+        generating = stats['elapsed_s'] - stats['ttft_s']
+        if generating > 0:
+            stats['tokens_per_s'] = stats['stream_chunks'] / generating
+
+def _ollama_chat_completion(messages, model_name, host_url, timeout=180, temperature=DEFAULT_TEMPERATURE,
+                            response_format=None, stream=False, on_token=None, stats=None):
+    """
+    Sends a full message history to the Ollama chat endpoint with temperature control.
+    response_format is passed through as Ollama's 'format' ("json" or a JSON schema).
+    With stream, chunks are consumed as they arrive and each content piece is passed to
+    on_token. If a stats dict is given it receives elapsed_s, num_ctx, the estimated and
+    actual prompt token counts, the generated token count, Ollama's load/prompt-eval/eval
+    durations in seconds and, when available, ttft_s (time to first token) and tokens_per_s.
+    """
+    if stats is None:
+        stats = {}
     api_url = f"{host_url.rstrip('/')}/api/chat"
+    num_ctx = size_context_window(messages, model_name, host_url, stats)
+    stats['num_ctx'] = num_ctx
     payload = {
         "model": model_name,
         "messages": messages,
-        "stream": False,
-        "temperature": temperature, # Add temperature to the payload
-        # The 'options' dictionary can also be used for parameters if preferred/needed for other settings
-        # "options": {
-        #     "temperature": temperature
-        # }
+        "stream": stream,
+        # Ollama only honours sampling and context settings inside 'options'
+        "options": {
+            "temperature": temperature,
+            "num_ctx": num_ctx,
+        },
     }
+    if response_format is not None:
+        payload["format"] = response_format
+    if _KEEP_ALIVE is not None:
+        payload["keep_alive"] = _KEEP_ALIVE
     response = None # Initialize response to None
     try:
         # Debug print for payload
         # print(f"DEBUG: Sending payload to {api_url}: {json.dumps(payload, indent=2)}")
-        response = requests.post(api_url, json=payload, timeout=timeout)
-        response.raise_for_status() # Check for HTTP errors
-        response_data = response.json()
+        with _LLM_SLOTS:
+            started = time.perf_counter()
+            response = requests.post(api_url, json=payload, timeout=timeout, stream=stream)
+            response.raise_for_status() # Check for HTTP errors
+            if stream:
+                content, response_data = _read_ndjson_stream(response, on_token, stats, started)
+                response_data = dict(response_data, message={"content": content})
+            else:
+                response_data = response.json()
+            stats['elapsed_s'] = time.perf_counter() - started
+        _record_generation_rate(stats, response_data, started)
+        for counter in ('prompt_eval_count', 'eval_count'):
+            if counter in response_data:
+                stats[counter] = response_data[counter]
+        # Ollama reports durations in nanoseconds
+        for duration, key in (('load_duration', 'load_s'), ('prompt_eval_duration', 'prompt_eval_s'),
+                              ('eval_duration', 'eval_s'), ('total_duration', 'total_s')):
+            if duration in response_data:
+                stats[key] = response_data[duration] / 1e9
 
         # Extract content based on expected Ollama API response structure
         if 'message' in response_data and 'content' in response_data['message']:
@@ -186,138 +663,1607 @@ def _ollama_chat_completion(messages, model_name, host_url, timeout=180, tempera
     except requests.exceptions.RequestException as e:
         # Handles HTTP errors (4xx, 5xx) after raise_for_status and other request issues
         print(f"\nError communicating with Ollama API at {api_url}: {e}", file=sys.stderr)
-        if response is not None: # Check if response exists before accessing .text
+        if response is not None and not stream: # Check if response exists before accessing .text
              print(f"Response body: {response.text}", file=sys.stderr)
         return None
-    except KeyError:
+    except (KeyError, json.JSONDecodeError):
         # This might happen if the JSON response is valid but missing expected keys
-        print(f"\nError parsing Ollama response structure. Raw response: {response.text if response is not None else 'No response object'}", file=sys.stderr)
+        print(f"\nError parsing Ollama response structure. Raw response: {response.text if response is not None and not stream else 'No response object'}", file=sys.stderr)
         return None
     except Exception as e:
         # Catch any other unexpected errors
         print(f"\nAn unexpected error occurred during Ollama chat completion: {e}", file=sys.stderr)
         return None
+    finally:
+        if response is not None and stream:
+            response.close()
+
+# --- Chunking (map-reduce for long transcripts) ---
+
+def estimate_tokens(text):
+    """Rough token count used for budgeting; about four characters per token for English."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
 
-def get_structured_summary(video_id, transcript_text, model_name, host_url, ignore_cache=False):
+def _split_oversized(line, max_tokens):
+    """Splits a single line that exceeds the chunk budget on word boundaries."""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for word in line.split():
+        word_tokens = estimate_tokens(word + " ")
+        if current and current_tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += word_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def _is_chunk_anchor(line):
+    """True for lines that may end a chunk; depends only on the line's own content."""
+    return int(hashlib.sha256(line.encode('utf-8')).hexdigest()[:8], 16) % CHUNK_ANCHOR_MODULUS == 0
+
+def chunk_transcript(transcript_text, max_tokens=DEFAULT_CHUNK_TOKENS, overlap_tokens=DEFAULT_CHUNK_OVERLAP):
     """
-    Generates multiple summaries using Ollama, managing conversation history and caching.
-    Returns a dictionary with summary parts or None if the first step fails.
-    Uses the default temperature set in _ollama_chat_completion unless overridden.
+    Splits a transcript into chunks of at most max_tokens (estimated), breaking on line
+    boundaries. The trailing lines of each chunk, up to overlap_tokens, are repeated at the
+    start of the next one so statements spanning a boundary are not lost.
+
+    Boundaries are content-defined (see CHUNK_ANCHOR_MODULUS), so an edit to one part of the
+    transcript changes only the chunks around it and the rest keep their content hashes.
     """
-    cache_file = os.path.join(CACHE_DIR, video_id + '.summaries.json')
+    min_tokens = int(max_tokens * CHUNK_MIN_FILL)
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    units = []
+    for line in transcript_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if estimate_tokens(line) > max_tokens:
+            units.extend(_split_oversized(line, max_tokens))
+        else:
+            units.append(line)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    def close_chunk(next_unit_tokens=0):
+        """Emits the current chunk and returns the overlap lines that start the next one."""
+        chunks.append("\n".join(current))
+        carried = []
+        carried_tokens = 0
+        for previous in reversed(current):
+            previous_tokens = estimate_tokens(previous) + 1
+            if carried_tokens + previous_tokens > overlap_tokens:
+                break
+            carried.insert(0, previous)
+            carried_tokens += previous_tokens
+        if carried_tokens + next_unit_tokens > max_tokens:
+            carried, carried_tokens = [], 0
+        return carried, carried_tokens
+
+    has_new_lines = False # False while current holds only lines carried over from the last chunk
+    for unit in units:
+        unit_tokens = estimate_tokens(unit) + 1 # +1 for the joining newline
+        if current_tokens + unit_tokens > max_tokens:
+            if has_new_lines:
+                current, current_tokens = close_chunk(unit_tokens)
+            else:
+                current, current_tokens = [], 0 # Overlap alone would overflow; drop it
+        current.append(unit)
+        current_tokens += unit_tokens
+        has_new_lines = True
+        if current_tokens >= min_tokens and _is_chunk_anchor(unit):
+            current, current_tokens = close_chunk()
+            has_new_lines = False
+    if has_new_lines:
+        chunks.append("\n".join(current))
+    return chunks
+
+def _run_concurrently(func, items, parallel):
+    """Maps func over items with a bounded thread pool, preserving input order."""
+    if len(items) <= 1 or parallel <= 1:
+        return [func(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(parallel, len(items))) as executor:
+        return list(executor.map(func, items))
+
+def _summarize_chunk(chunk_text, index, total, model_name, host_url, metrics=None, temperature=DEFAULT_TEMPERATURE):
+    """
+    Map step: summarizes one section of a long transcript. The prompt deliberately leaves
+    out the section's position so the result can be cached by the chunk's content alone.
+    """
+    messages = [
+        {"role": "system", "content": "You are an AI assistant specialized in analyzing video transcripts. Follow instructions precisely and provide only the requested output."},
+        {"role": "user", "content": f"The following is one section of a long video transcript. Summarize the key points of this section in one dense paragraph. Keep names, numbers, claims and conclusions. PROVIDE NO OTHER OUTPUT OTHER THAN THE PARAGRAPH.\n\nTranscript section:\n``````{chunk_text}``````"},
+    ]
+    return _chat_step(f'chunk {index}/{total}', messages, model_name, host_url, metrics, temperature=temperature)
+
+def _merge_partials(partials, model_name, host_url, metrics=None, temperature=DEFAULT_TEMPERATURE):
+    """Reduce step: merges consecutive section summaries into one, preserving their order."""
+    joined = "\n\n".join(f"Section {i}:\n{text}" for i, text in enumerate(partials, 1))
+    messages = [
+        {"role": "system", "content": "You are an AI assistant specialized in analyzing video transcripts. Follow instructions precisely and provide only the requested output."},
+        {"role": "user", "content": f"The following are summaries of consecutive sections of a video transcript, in order. Merge them into one dense paragraph that keeps the key points, names, numbers and conclusions of every section. PROVIDE NO OTHER OUTPUT OTHER THAN THE PARAGRAPH.\n\n{joined}"},
+    ]
+    return _chat_step('reduce', messages, model_name, host_url, metrics, temperature=temperature)
+
+def _group_partials(partials, max_tokens):
+    """Packs consecutive partial summaries into groups that fit max_tokens (at least two per group)."""
+    groups = []
+    current = []
+    current_tokens = 0
+    for partial in partials:
+        partial_tokens = estimate_tokens(partial)
+        if len(current) >= 2 and current_tokens + partial_tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(partial)
+        current_tokens += partial_tokens
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
+
+def condense_transcript(transcript_text, model_name, host_url, chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                        chunk_overlap=DEFAULT_CHUNK_OVERLAP, parallel=DEFAULT_PARALLEL, metrics=None,
+                        temperature=DEFAULT_TEMPERATURE, cache=None, ignore_cache=False, stats=None):
+    """
+    Returns (text, was_chunked). Transcripts that fit in chunk_tokens are returned unchanged.
+    Longer ones are split into overlapping chunks, each chunk is summarized concurrently
+    (map), and the partial summaries are merged level by level (tree reduce) until they fit
+    into a single chunk. Returns (None, True) if any model call fails.
+
+    With a SummaryCache, each chunk's partial summary is cached under the chunk's content
+    hash, so after small caption edits only the changed chunks are summarized again before
+    the reduce step. Per-call timing stats are appended to metrics if a list is given, and
+    stats receives the chunk count and how many partial summaries were reused.
+    """
+    if estimate_tokens(transcript_text) <= chunk_tokens:
+        return transcript_text, False
+
+    chunks = chunk_transcript(transcript_text, chunk_tokens, chunk_overlap)
+    total = len(chunks)
+    chunk_keys = [SummaryCache.make_chunk_key(chunk, model_name, temperature) for chunk in chunks]
+    reused = {}
+    if cache is not None and not ignore_cache:
+        try:
+            reused = cache.get_chunks(chunk_keys)
+        except sqlite3.Error as e:
+            print(f"Warning: Could not read cached chunk summaries: {e}", file=sys.stderr)
+    pending = [(index, chunk, key) for index, (chunk, key) in enumerate(zip(chunks, chunk_keys), 1) if key not in reused]
+    if stats is not None:
+        stats.update(chunks=total, chunks_reused=total - len(pending))
+    print(f"Transcript is ~{estimate_tokens(transcript_text)} tokens in {total} chunks; "
+          f"summarizing {len(pending)} ({min(parallel, max(len(pending), 1))} at a time), reusing {total - len(pending)} from cache...")
 
-    if not ignore_cache and os.path.isfile(cache_file):
+    def summarize(item):
+        index, chunk, key = item
+        partial = _summarize_chunk(chunk, index, total, model_name, host_url, metrics, temperature)
+        if partial and cache is not None:
+            try:
+                cache.put_chunk(key, partial, model_name)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not cache chunk summary: {e}", file=sys.stderr)
+        return partial
+
+    fresh = dict(zip((key for _, _, key in pending), _run_concurrently(summarize, pending, parallel)))
+    partials = [reused[key] if key in reused else fresh[key] for key in chunk_keys]
+    if not all(partials):
+        print(f"Failed to summarize {partials.count(None)} of {total} transcript chunks.", file=sys.stderr)
+        return None, True
+
+    level = 0
+    while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > chunk_tokens:
+        level += 1
+        if level > MAX_REDUCE_LEVELS:
+            print("Warning: Partial summaries still exceed the chunk budget; continuing with them as-is.", file=sys.stderr)
+            break
+        groups = _group_partials(partials, chunk_tokens)
+        print(f"Reducing {len(partials)} partial summaries into {len(groups)} (level {level})...")
+        partials = _run_concurrently(
+            lambda group: _merge_partials(group, model_name, host_url, metrics, temperature),
+            groups,
+            parallel,
+        )
+        if not all(partials):
+            print("Failed to merge partial summaries.", file=sys.stderr)
+            return None, True
+
+    return "\n\n".join(partials), True
+
+# --- Summary Cache ---
+
+class SummaryCache:
+    """
+    Content-addressed store for structured summaries.
+
+    Entries are keyed by a hash of the transcript text, model, temperature, PROMPT_VERSION
+    and any generation options that change the output, so switching models or prompts never
+    returns a stale summary. Summaries live as JSON files under summaries/; an SQLite index
+    tracks their size and last access for LRU eviction and keeps hit/miss counters. The
+    index also holds the partial summaries of individual transcript chunks, keyed by chunk
+    content, for incremental re-summarization.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024,
+                 max_age_s=DEFAULT_CACHE_MAX_AGE_DAYS * 86400):
+        cache_dir = cache_dir or CACHE_DIR
+        self.summary_dir = os.path.join(cache_dir, SUMMARY_SUBDIR)
+        self.index_path = os.path.join(cache_dir, CACHE_INDEX_FILE)
+        self.lock_dir = os.path.join(cache_dir, LOCK_SUBDIR)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        os.makedirs(self.summary_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS summaries (
+                cache_key TEXT PRIMARY KEY,
+                video_id TEXT,
+                model TEXT,
+                temperature REAL,
+                prompt_version INTEGER,
+                transcript_sha256 TEXT,
+                size_bytes INTEGER,
+                created_at REAL,
+                last_access REAL,
+                hits INTEGER DEFAULT 0)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS chunk_summaries (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                summary TEXT,
+                created_at REAL,
+                last_access REAL)""")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+
+    def _connect(self):
+        # A short-lived connection per operation keeps the cache safe to use from several threads
+        return contextlib.closing(sqlite3.connect(self.index_path, timeout=30, isolation_level=None))
+
+    def _path(self, cache_key):
+        return os.path.join(self.summary_dir, f"{cache_key}.json")
+
+    def lock_path(self, cache_key):
+        """Lock file guarding the generation of one summary (see key_lock)."""
+        return os.path.join(self.lock_dir, f"{cache_key}.lock")
+
+    @staticmethod
+    def make_key(transcript_text, model_name, temperature, options=None):
+        """Returns (cache_key, transcript_sha256) for a transcript and the settings that shape its summary."""
+        transcript_sha256 = hashlib.sha256(transcript_text.encode('utf-8')).hexdigest()
+        key_material = json.dumps({
+            "transcript": transcript_sha256,
+            "model": model_name,
+            "temperature": temperature,
+            "prompt_version": PROMPT_VERSION,
+            "options": options or {},
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest(), transcript_sha256
+
+    @staticmethod
+    def make_chunk_key(chunk_text, model_name, temperature):
+        """Returns the cache key for one transcript chunk's partial summary."""
+        key_material = json.dumps({
+            "chunk": hashlib.sha256(chunk_text.encode('utf-8')).hexdigest(),
+            "model": model_name,
+            "temperature": temperature,
+            "prompt_version": PROMPT_VERSION,
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+    def get_chunks(self, cache_keys):
+        """Returns {cache_key: partial summary} for the chunk keys that are cached."""
+        found = {}
+        with self._connect() as conn:
+            for cache_key in set(cache_keys):
+                row = conn.execute("SELECT summary FROM chunk_summaries WHERE cache_key = ?", (cache_key,)).fetchone()
+                if row is not None:
+                    found[cache_key] = row[0]
+            if found:
+                conn.executemany("UPDATE chunk_summaries SET last_access = ? WHERE cache_key = ?",
+                                 [(time.time(), cache_key) for cache_key in found])
+        return found
+
+    def put_chunk(self, cache_key, summary, model_name):
+        """Stores one chunk's partial summary in the index."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO chunk_summaries (cache_key, model, summary, created_at, last_access) "
+                         "VALUES (?, ?, ?, ?, ?)", (cache_key, model_name, summary, now, now))
+
+    def _bump(self, conn, name):
+        conn.execute("INSERT INTO stats (name, value) VALUES (?, 1) "
+                     "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, cache_key):
+        """Returns the cached summaries for cache_key, or None on a miss."""
+        path = self._path(cache_key)
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM summaries WHERE cache_key = ?", (cache_key,)).fetchone()
+            summaries = None
+            if row is not None:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        summaries = json.load(f)
+                except (json.JSONDecodeError, IOError, UnicodeDecodeError) as e:
+                    print(f"Warning: Could not read cache file {path}: {e}. Regenerating.", file=sys.stderr)
+                    conn.execute("DELETE FROM summaries WHERE cache_key = ?", (cache_key,))
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            if summaries is None:
+                self._bump(conn, 'misses')
+                return None
+            conn.execute("UPDATE summaries SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                         (time.time(), cache_key))
+            self._bump(conn, 'hits')
+        print(f'Using cached summaries: {path}')
+        return summaries
+
+    def put(self, cache_key, summaries, video_id, model_name, temperature, transcript_sha256):
+        """Atomically writes summaries to the cache, indexes them and evicts old entries."""
+        path = self._path(cache_key)
+        fd, temp_path = tempfile.mkstemp(dir=self.summary_dir, prefix=f".{cache_key}.", suffix=".tmp")
         try:
-            print(f'Using cached summaries: {cache_file}')
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError, UnicodeDecodeError) as e:
-            print(f"Warning: Could not read cache file {cache_file}: {e}. Regenerating.", file=sys.stderr)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(summaries, f, indent=4, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except (IOError, OSError) as e:
+            print(f"\nWarning: Could not write cache file {path}: {e}", file=sys.stderr)
             try:
-                 os.remove(cache_file)
+                os.remove(temp_path)
             except OSError:
-                 pass
+                pass
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("""INSERT OR REPLACE INTO summaries
+                (cache_key, video_id, model, temperature, prompt_version, transcript_sha256,
+                 size_bytes, created_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+                (cache_key, video_id, model_name, temperature, PROMPT_VERSION, transcript_sha256,
+                 os.path.getsize(path), now, now))
+        print(f'\nSummaries saved to cache: {path}')
+        self.evict()
+
+    def evict(self):
+        """
+        Drops entries (summaries and chunk summaries alike) unused for longer than max_age_s,
+        then the least recently used ones until the total is under max_bytes.
+        """
+        evicted = []
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT 'summaries', cache_key, size_bytes, last_access FROM summaries
+                UNION ALL
+                SELECT 'chunk_summaries', cache_key, LENGTH(CAST(summary AS BLOB)), last_access FROM chunk_summaries
+                ORDER BY last_access DESC""").fetchall()
+            cutoff = time.time() - self.max_age_s if self.max_age_s else None
+            total = 0
+            for table, cache_key, size_bytes, last_access in rows:
+                total += size_bytes or 0
+                if (cutoff is not None and last_access < cutoff) or (self.max_bytes and total > self.max_bytes):
+                    evicted.append((table, cache_key))
+            for table, cache_key in evicted:
+                conn.execute(f"DELETE FROM {table} WHERE cache_key = ?", (cache_key,))
+                if table == 'summaries':
+                    # The lock file stays: removing it while another process holds or waits on it
+                    # would let a third process lock a new file and run the same summary again
+                    try:
+                        os.remove(self._path(cache_key))
+                    except OSError:
+                        pass
+        if evicted:
+            print(f"Evicted {len(evicted)} cached summaries.")
+        return len(evicted)
 
-    print("\n--- Generating Summaries ---")
-    summaries = {}
+    def iter_entries(self):
+        """Yields (video_id, summaries) for every readable cached summary, least recently used first."""
+        with self._connect() as conn:
+            entries = conn.execute("SELECT cache_key, video_id FROM summaries ORDER BY last_access").fetchall()
+        for cache_key, video_id in entries:
+            try:
+                with open(self._path(cache_key), 'r', encoding='utf-8') as f:
+                    yield video_id, json.load(f)
+            except (json.JSONDecodeError, IOError, UnicodeDecodeError):
+                continue
+
+    def stats(self):
+        """Returns entry count, total bytes and lifetime hit/miss counters."""
+        with self._connect() as conn:
+            entries, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM summaries").fetchone()
+            chunk_entries, chunk_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(summary AS BLOB))), 0) FROM chunk_summaries").fetchone()
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "chunk_entries": chunk_entries,
+            "bytes": total_bytes + chunk_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+# --- Structured Summary ---
+
+SYSTEM_PROMPT = "You are an AI assistant specialized in analyzing video transcripts. Follow instructions precisely and provide only the requested output for each step."
+
+# JSON schema for single-shot mode; Ollama constrains generation to it via the 'format' field.
+STRUCTURED_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "paragraph": {"type": "string"},
+        "sentence": {"type": "string"},
+        "question": {"type": "string"},
+        "answer": {"type": "string"},
+        "wikipedia_term": {"type": "string"},
+    },
+    "required": ["paragraph", "sentence", "question", "answer", "wikipedia_term"],
+}
+
+# Maps schema fields to the keys used in the summaries dictionary and cache files.
+SCHEMA_FIELD_KEYS = {
+    "paragraph": "paragraph",
+    "sentence": "sentence",
+    "question": "question",
+    "answer": "word_raw",
+    "wikipedia_term": "wikipedia_term",
+}
+
+# Steps that --short-model routes to a smaller model: everything after the paragraph
+SHORT_ANSWER_STEPS = ("sentence", "question", "answer", "wikipedia_term")
+
+def parse_step_models(specs, short_model=None):
+    """
+    Builds the per-step model routing from --short-model and 'STEP=MODEL' specs (later specs
+    win). Step names are the single-shot schema fields. Returns a dict of summaries keys to
+    model names; raises ValueError for malformed specs or unknown steps.
+    """
+    step_models = {}
+    if short_model:
+        step_models.update((SCHEMA_FIELD_KEYS[step], short_model) for step in SHORT_ANSWER_STEPS)
+    for spec in specs or []:
+        step, sep, model = spec.partition('=')
+        step = step.strip()
+        if not sep or not model.strip():
+            raise ValueError(f"Invalid step model '{spec}', expected STEP=MODEL")
+        if step not in SCHEMA_FIELD_KEYS:
+            raise ValueError(f"Unknown step '{step}' (choose from {', '.join(SCHEMA_FIELD_KEYS)})")
+        step_models[SCHEMA_FIELD_KEYS[step]] = model.strip()
+    return step_models
+
+def print_token_report(metrics):
+    """Prints prompt/generated token totals and the largest context window used across model calls."""
+    calls = [entry for entry in metrics if entry.get('ok')]
+    if not calls:
+        return
+    prompt_tokens = sum(entry.get('prompt_eval_count', entry.get('prompt_tokens_est', 0)) for entry in calls)
+    eval_tokens = sum(entry.get('eval_count', 0) for entry in calls)
+    largest_ctx = max(entry.get('num_ctx', 0) for entry in calls)
+    truncated = sum(1 for entry in calls if entry.get('truncated'))
+    line = f"Tokens: {prompt_tokens} prompt, {eval_tokens} generated over {len(calls)} calls (largest num_ctx {largest_ctx})"
+    if truncated:
+        line += f"; {truncated} prompts truncated"
+    print(line)
+
+def _chat_step(step, messages, model_name, host_url, metrics=None, stream=False, on_token=None, **kwargs):
+    """
+    Runs one named model call. When streaming, prints time-to-first-token and tokens/sec
+    for the step; if a metrics list is given, the step's stats are appended to it.
+    """
+    stats = {}
+    content = _ollama_chat_completion(messages, model_name, host_url, stream=stream, on_token=on_token, stats=stats, **kwargs)
+    if on_token is not None and stats.get('stream_chunks'):
+        print() # End the line of streamed tokens
+    if stream and content is not None and 'ttft_s' in stats:
+        rate = f", {stats['tokens_per_s']:.1f} tok/s" if 'tokens_per_s' in stats else ""
+        print(f"   [{step}] first token after {stats['ttft_s']:.2f}s{rate}, total {stats['elapsed_s']:.2f}s")
+    if metrics is not None:
+        metrics.append(dict(step=step, model=model_name, ok=content is not None, **stats))
+    return content
+
+def _print_token(piece):
+    print(piece, end="", flush=True)
+
+def _paragraph_prompt(source_label, source_text):
+    return f"Summarize the key points from the following video transcript into a single, concise paragraph. Focus on the main arguments, findings, or the core message presented in the text. PROVIDE NO OTHER OUTPUT OTHER THAN THE PARAGRAPH.\n\n{source_label}:\n``````{source_text}``````"
+
+def _paragraph_context_message(paragraph, prompt_text):
+    """A routed step's only user message: the paragraph summary stands in for the transcript."""
+    return {"role": "user", "content": f"Summary of the video transcript:\n``````{paragraph}``````\n\n{prompt_text}"}
+
+def _answer_prompt(summaries):
+    question_prompt = summaries['question'].replace('"', "'")
+    return f'Provide a very concise answer (ideally one or two words, max a short phrase) to the question "{question_prompt}", based *only* on the transcript content. Examples: "Is X true?" -> "Yes."/"No."/"Maybe."; "Why did Y happen?" -> "Reason Z."/"It\'s complex.". PROVIDE NO OTHER OUTPUT OTHER THAN THE CONCISE ANSWER.'
+
+# Follow-up steps after the paragraph: (summaries key, progress label, prompt, error placeholder).
+# A prompt may be a callable taking the summaries gathered so far.
+FOLLOW_UP_STEPS = [
+    ('sentence', "2. Generating sentence summary...",
+     "Now, based *only* on the transcript content provided earlier, condense the absolute core message or main takeaway into a single sentence. PROVIDE NO OTHER OUTPUT OTHER THAN THE SENTENCE.",
+     "[Error generating sentence summary]"),
+    ('question', "3. Generating question...",
+     "Based *only* on the transcript content discussed so far, formulate a single question that effectively captures the main TOPIC or SUBJECT addressed. PROVIDE NO OTHER OUTPUT OTHER THAN THE QUESTION.",
+     "[Error generating question]"),
+    ('word_raw', "4. Generating concise answer...", _answer_prompt, "[Error generating answer]"),
+    ('wikipedia_term', "5. Generating Wikipedia search term...",
+     'Suggest a specific and concise search term for Wikipedia that best represents the main TOPIC discussed in the transcript. Examples: "Discussion about AI replacing jobs" -> "Technological unemployment"; "History of the Eiffel Tower construction" -> "Eiffel Tower". PROVIDE NO OTHER OUTPUT OTHER THAN THE SEARCH TERM ITSELF.',
+     "[Error generating term]"),
+]
+
+def _run_multi_turn_steps(source_label, source_text, model_name, host_url, summaries, stream=False, metrics=None,
+                          temperature=DEFAULT_TEMPERATURE, step_models=None):
+    """
+    Runs the five-step conversation, one request per step. Steps whose key is already in
+    summaries (e.g. from a partially valid single-shot response) are replayed into the
+    message history without calling the model. With stream, the paragraph is printed as
+    it is generated. Steps that step_models routes to another model get only the paragraph
+    as context instead of the whole conversation. Returns False if no paragraph could be made.
+    """
+    step_models = step_models or {}
     messages = [
-        {"role": "system", "content": "You are an AI assistant specialized in analyzing video transcripts. Follow instructions precisely and provide only the requested output for each step."},
-        {"role": "user", "content": f"Summarize the key points from the following video transcript into a single, concise paragraph. Focus on the main arguments, findings, or the core message presented in the text. PROVIDE NO OTHER OUTPUT OTHER THAN THE PARAGRAPH.\n\nTranscript:\n``````{transcript_text}``````"},
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": _paragraph_prompt(source_label, source_text)},
     ]
 
-    print("1. Generating paragraph summary...")
-    # Calls will now use the default temperature=0.0 unless explicitly overridden here
-    paragraph_summary = _ollama_chat_completion(messages, model_name, host_url)
-    if not paragraph_summary:
-        print("Failed to generate initial paragraph summary. Aborting.", file=sys.stderr)
-        return None
-    summaries['paragraph'] = paragraph_summary
-    messages.append({"role": "assistant", "content": paragraph_summary})
-
-    print("2. Generating sentence summary...")
-    messages.append({"role": "user", "content": "Now, based *only* on the transcript content provided earlier, condense the absolute core message or main takeaway into a single sentence. PROVIDE NO OTHER OUTPUT OTHER THAN THE SENTENCE."})
-    sentence_summary = _ollama_chat_completion(messages, model_name, host_url)
-    if not sentence_summary:
-        sentence_summary = "[Error generating sentence summary]"
-    summaries['sentence'] = sentence_summary
-    messages.append({"role": "assistant", "content": sentence_summary})
-
-    print("3. Generating question...")
-    messages.append({"role": "user", "content": "Based *only* on the transcript content discussed so far, formulate a single question that effectively captures the main TOPIC or SUBJECT addressed. PROVIDE NO OTHER OUTPUT OTHER THAN THE QUESTION."})
-    question = _ollama_chat_completion(messages, model_name, host_url)
-    if not question:
-        question = "[Error generating question]"
-    summaries['question'] = question
-    messages.append({"role": "assistant", "content": question})
-
-    print("4. Generating concise answer...")
-    question_prompt = question.replace('"', "'")
-    messages.append({"role": "user", "content": f'Provide a very concise answer (ideally one or two words, max a short phrase) to the question "{question_prompt}", based *only* on the transcript content. Examples: "Is X true?" -> "Yes."/"No."/"Maybe."; "Why did Y happen?" -> "Reason Z."/"It\'s complex.". PROVIDE NO OTHER OUTPUT OTHER THAN THE CONCISE ANSWER.'})
-    word_answer = _ollama_chat_completion(messages, model_name, host_url)
-    if not word_answer:
-        word_answer = "[Error generating answer]"
-    summaries['word_raw'] = word_answer
-    messages.append({"role": "assistant", "content": word_answer})
-
-    print("5. Generating Wikipedia search term...")
-    messages.append({"role": "user", "content": 'Suggest a specific and concise search term for Wikipedia that best represents the main TOPIC discussed in the transcript. Examples: "Discussion about AI replacing jobs" -> "Technological unemployment"; "History of the Eiffel Tower construction" -> "Eiffel Tower". PROVIDE NO OTHER OUTPUT OTHER THAN THE SEARCH TERM ITSELF.'})
-    wiki_term = _ollama_chat_completion(messages, model_name, host_url)
-    if not wiki_term:
-        wiki_term = "[Error generating term]"
-    messages.append({"role": "assistant", "content": wiki_term})
-
-    summaries['word'] = f"{word_answer} ({wiki_term})" if not ('[Error' in word_answer or '[Error' in wiki_term) else word_answer
-    summaries['wikipedia_url'] = 'https://en.wikipedia.org/w/index.php?search=' + quote_plus(wiki_term if '[Error' not in wiki_term else "")
-    summaries['wikipedia_term'] = wiki_term
+    if 'paragraph' not in summaries:
+        print("1. Generating paragraph summary...")
+        # Calls will now use the default temperature=0.0 unless explicitly overridden here
+        paragraph_summary = _chat_step('paragraph', messages, model_name, host_url, metrics,
+                                       stream=stream, on_token=_print_token if stream else None,
+                                       temperature=temperature)
+        if not paragraph_summary:
+            print("Failed to generate initial paragraph summary. Aborting.", file=sys.stderr)
+            return False
+        summaries['paragraph'] = paragraph_summary
+    messages.append({"role": "assistant", "content": summaries['paragraph']})
+
+    for key, label, prompt, placeholder in FOLLOW_UP_STEPS:
+        prompt_text = prompt(summaries) if callable(prompt) else prompt
+        messages.append({"role": "user", "content": prompt_text})
+        if key not in summaries:
+            step_model = step_models.get(key, model_name)
+            if step_model == model_name:
+                print(label)
+                step_messages = messages
+            else:
+                print(f"{label} ({step_model})")
+                step_messages = [messages[0], _paragraph_context_message(summaries['paragraph'], prompt_text)]
+            summaries[key] = _chat_step(key, step_messages, step_model, host_url, metrics, stream=stream,
+                                        temperature=temperature) or placeholder
+        messages.append({"role": "assistant", "content": summaries[key]})
+    return True
 
+def _parse_structured_response(raw_text):
+    """
+    Validates a single-shot JSON response. Returns a dict of summaries keys for every
+    field that is present and non-empty; invalid or missing fields are left out.
+    """
+    if not raw_text:
+        return {}
+    text = raw_text.strip()
+    if text.startswith("```"):
+        # Some models still wrap the JSON in a code fence despite the format constraint
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
     try:
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(summaries, f, indent=4, ensure_ascii=False)
-        print(f'\nSummaries saved to cache: {cache_file}')
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        print(f"Warning: Single-shot response was not valid JSON: {e}", file=sys.stderr)
+        return {}
+    if not isinstance(data, dict):
+        print("Warning: Single-shot response was not a JSON object.", file=sys.stderr)
+        return {}
+
+    parsed = {}
+    for field, key in SCHEMA_FIELD_KEYS.items():
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            parsed[key] = value.strip()
+    return parsed
+
+def _single_shot_summary(source_label, source_text, model_name, host_url, stream=False, metrics=None,
+                         temperature=DEFAULT_TEMPERATURE):
+    """Requests all five fields in one call using Ollama's JSON-schema constrained output."""
+    print("Generating all summary fields in a single request...")
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            "Analyze the following video transcript and respond with a JSON object containing:\n"
+            "- paragraph: the key points (main arguments, findings, or core message) in a single, concise paragraph\n"
+            "- sentence: the absolute core message or main takeaway in a single sentence\n"
+            "- question: a single question that captures the main TOPIC or SUBJECT addressed\n"
+            "- answer: a very concise answer to that question (ideally one or two words, max a short phrase), e.g. \"Yes.\", \"No.\", \"Reason Z.\"\n"
+            "- wikipedia_term: a specific and concise Wikipedia search term for the main TOPIC, e.g. \"Technological unemployment\"\n"
+            "Base every field *only* on the transcript content.\n\n"
+            f"{source_label}:\n``````{source_text}``````"
+        )},
+    ]
+    raw = _chat_step('single_shot', messages, model_name, host_url, metrics, stream=stream,
+                     response_format=STRUCTURED_SUMMARY_SCHEMA, temperature=temperature)
+    return _parse_structured_response(raw)
+
+def get_structured_summary(video_id, transcript_text, model_name, host_url, ignore_cache=False,
+                           chunk_tokens=DEFAULT_CHUNK_TOKENS, chunk_overlap=DEFAULT_CHUNK_OVERLAP,
+                           parallel=DEFAULT_PARALLEL, single_shot=False, stream=False, metrics=None,
+                           temperature=DEFAULT_TEMPERATURE, cache=None, stats=None, step_models=None):
+    """
+    Generates multiple summaries using Ollama, managing conversation history and caching.
+    Results are stored in cache (a SummaryCache; the default one under CACHE_DIR if None).
+    Transcripts longer than chunk_tokens are condensed first (see condense_transcript).
+    With single_shot, all fields are requested in one JSON-constrained call and only the
+    fields that fail validation are regenerated through the multi-turn conversation.
+    step_models (see parse_step_models) sends individual follow-up steps to other models;
+    a 'paragraph' entry replaces model_name.
+    With stream, responses are consumed incrementally; per-call timing stats are appended
+    to metrics if a list is given, and the cache outcome ('hit', 'miss' or 'bypass') is
+    stored in stats['cache'] if a stats dict is given.
+    Returns a dictionary with summary parts or None if the first step fails.
+    """
+    if cache is None:
+        cache = SummaryCache()
+    if metrics is None:
+        metrics = []
+    if stats is None:
+        stats = {}
+    # Options that change the generated text are part of the cache key
+    cache_options = {"single_shot": single_shot}
+    step_models = dict(step_models or {})
+    # The paragraph model is the main model: it also condenses long transcripts and runs single-shot
+    model_name = step_models.pop('paragraph', model_name)
+    step_models = {key: model for key, model in step_models.items() if model != model_name}
+    if step_models:
+        cache_options["step_models"] = step_models
+    if estimate_tokens(transcript_text) > chunk_tokens:
+        cache_options.update(chunk_tokens=chunk_tokens, chunk_overlap=chunk_overlap)
+    cache_key, transcript_sha256 = SummaryCache.make_key(transcript_text, model_name, temperature, cache_options)
+
+    stats['cache'] = 'bypass'
+    if not ignore_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            stats['cache'] = 'hit'
+            return cached
+        stats['cache'] = 'miss'
+
+    # Another process (or server worker) generating the same summary holds this lock;
+    # wait for it and reuse its result instead of spending the model time twice
+    with key_lock(cache.lock_path(cache_key), "to finish this summary", stats) as waited:
+        if waited and not ignore_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                stats['cache'] = 'hit'
+                return cached
+
+        print("\n--- Generating Summaries ---")
+        source_text, was_chunked = condense_transcript(
+            transcript_text, model_name, host_url,
+            chunk_tokens=chunk_tokens, chunk_overlap=chunk_overlap, parallel=parallel, metrics=metrics,
+            temperature=temperature, cache=cache, ignore_cache=ignore_cache, stats=stats,
+        )
+        if source_text is None:
+            print("Failed to condense the transcript. Aborting.", file=sys.stderr)
+            return None
+        source_label = "Transcript (condensed from section summaries of a long video)" if was_chunked else "Transcript"
+
+        summaries = {}
+        if single_shot:
+            summaries = _single_shot_summary(source_label, source_text, model_name, host_url, stream=stream, metrics=metrics,
+                                             temperature=temperature)
+            missing = [field for field, key in SCHEMA_FIELD_KEYS.items() if key not in summaries]
+            if missing:
+                print(f"Falling back to multi-turn generation for: {', '.join(missing)}")
+        if not _run_multi_turn_steps(source_label, source_text, model_name, host_url, summaries, stream=stream, metrics=metrics,
+                                     temperature=temperature, step_models=step_models):
+            return None
+
+        print_token_report(metrics)
+
+        word_answer = summaries['word_raw']
+        wiki_term = summaries['wikipedia_term']
+        summaries['word'] = f"{word_answer} ({wiki_term})" if not ('[Error' in word_answer or '[Error' in wiki_term) else word_answer
+        summaries['wikipedia_url'] = 'https://en.wikipedia.org/w/index.php?search=' + quote_plus(wiki_term if '[Error' not in wiki_term else "")
+
+        try:
+            cache.put(cache_key, summaries, video_id, model_name, temperature, transcript_sha256)
+        except sqlite3.Error as e:
+            print(f"\nWarning: Could not update cache index {cache.index_path}: {e}", file=sys.stderr)
+
+        return summaries
+
+# --- Profiling ---
+
+_PROFILE_LOG_LOCK = threading.Lock()
+
+def build_profile_record(video_id, model_name, host_url, transcript_stats, summary_stats, metrics, wall_s):
+    """Assembles one machine-readable profile record for a video: transcript fetch, cache outcome and per-call timings."""
+    calls = [entry for entry in metrics if entry.get('ok')]
+    totals = {
+        "calls": len(metrics),
+        "failed_calls": len(metrics) - len(calls),
+        "prompt_eval_count": sum(entry.get('prompt_eval_count', 0) for entry in calls),
+        "eval_count": sum(entry.get('eval_count', 0) for entry in calls),
+    }
+    for key in ('load_s', 'prompt_eval_s', 'eval_s', 'elapsed_s'):
+        totals[key] = round(sum(entry.get(key, 0.0) for entry in calls), 4)
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "video_id": video_id,
+        "model": model_name,
+        "host": host_url,
+        "transcript": transcript_stats,
+        "summary_cache": summary_stats.get('cache'),
+        "chunks": summary_stats.get('chunks'),
+        "chunks_reused": summary_stats.get('chunks_reused'),
+        "steps": metrics,
+        "totals": totals,
+        "wall_s": round(wall_s, 4),
+    }
+
+def print_profile(record):
+    """Prints where the time went: model load, prompt evaluation or generation, per step."""
+    transcript = record['transcript']
+    print("\n--- Profile ---")
+    print(f"Transcript        : {transcript.get('fetch_s', 0.0):.2f}s ({transcript.get('source', 'n/a')}, ~{transcript.get('tokens_est', 0)} tokens"
+          f"{', %.0f%% of raw' % (100 * transcript['token_ratio']) if 'token_ratio' in transcript else ''})")
+    print(f"Summary cache     : {record['summary_cache']}")
+    if record['steps']:
+        print(f"{'Step':<18} {'Load':>7} {'Prompt eval':>18} {'Generation':>18} {'Wall':>8}")
+        for entry in record['steps'] + [dict(record['totals'], step='TOTAL')]:
+            print(f"{entry['step']:<18} {entry.get('load_s', 0.0):>6.2f}s "
+                  f"{entry.get('prompt_eval_s', 0.0):>8.2f}s ({entry.get('prompt_eval_count', 0):>6}) "
+                  f"{entry.get('eval_s', 0.0):>8.2f}s ({entry.get('eval_count', 0):>6}) "
+                  f"{entry.get('elapsed_s', 0.0):>7.2f}s")
+    print(f"Wall clock        : {record['wall_s']:.2f}s")
+
+def write_profile(record, profile_output=None, metrics_log=None):
+    """
+    Writes the profile record (or, in batch mode, a list of them) as JSON to profile_output
+    and/or appends it as one line to metrics_log.
+    """
+    try:
+        if profile_output:
+            with open(profile_output, 'w', encoding='utf-8') as f:
+                json.dump(record, f, indent=4, ensure_ascii=False)
+        if metrics_log:
+            with _PROFILE_LOG_LOCK, open(metrics_log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
     except IOError as e:
-        print(f"\nWarning: Could not write cache file {cache_file}: {e}", file=sys.stderr)
-    except Exception as e:
-        print(f"\nWarning: An unexpected error occurred writing cache file {cache_file}: {e}", file=sys.stderr)
+        print(f"Warning: Could not write profile metrics: {e}", file=sys.stderr)
 
-    return summaries
+def profiling_enabled(args):
+    """True if any profiling flag was given."""
+    return args.profile or bool(args.profile_output) or bool(args.metrics_log)
 
-# --- Main Execution ---
-def main():
+# --- Batch Pipeline ---
+
+def read_url_list(path):
+    """Reads URLs from a file (or stdin for '-'), one per line; blank lines and # comments are skipped."""
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+def is_playlist_url(url):
+    """True for playlist pages; watch URLs that merely carry a list= parameter are single videos."""
+    query = parse_qs(urlparse(url).query)
+    return 'list' in query and 'v' not in query and "youtu.be/" not in url
+
+def expand_playlist(url):
+    """
+    Returns the video ids listed on a YouTube playlist page, in playlist order. Only the
+    videos embedded in the initial page (the first 100) are returned.
+    """
+    response = requests.get(url, headers={"Accept-Language": "en"}, timeout=30)
+    response.raise_for_status()
+    video_ids = []
+    for video_id in re.findall(r'"playlistVideoRenderer":\{"videoId":"([\w-]{11})"', response.text):
+        if video_id not in video_ids:
+            video_ids.append(video_id)
+    if not video_ids:
+        raise ValueError(f"No videos found on playlist page: {url}")
+    return video_ids
+
+def resolve_inputs(urls):
+    """
+    Expands playlists and parses video ids. Returns a list of (url, video_id, error) tuples in
+    input order; error is None when the id was parsed.
+    """
+    entries = []
+    for url in urls:
+        if is_playlist_url(url):
+            try:
+                video_ids = expand_playlist(url)
+                print(f"Expanded playlist into {len(video_ids)} videos: {url}", file=sys.stderr)
+                entries.extend((f"https://www.youtube.com/watch?v={video_id}", video_id, None) for video_id in video_ids)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                entries.append((url, None, f"Could not expand playlist: {e}"))
+            continue
+        try:
+            entries.append((url, get_video_id(url), None))
+        except ValueError as e:
+            entries.append((url, None, str(e)))
+    return entries
+
+def run_batch(entries, args, cache, out, search_index=None):
+    """
+    Summarizes many videos as a two-stage pipeline. Transcript fetches run on a pool of
+    args.fetch_workers threads; each finished fetch is handed to a pool of args.parallel
+    summarization workers, so the network and the model are busy at the same time.
+    One JSON record per input is written to out, in input order, as soon as it and every
+    earlier record are ready. With profiling on, each record carries its profile and the
+    profiles are written as configured. New summaries are added to search_index if given.
+    Returns the number of failed inputs.
+    """
+    results = [concurrent.futures.Future() for _ in entries]
+    profiling = profiling_enabled(args)
+
+    def summarize(index, video_id, transcript_text, transcript_stats, started):
+        metrics = []
+        summary_stats = {}
+        try:
+            summaries = get_structured_summary(
+                video_id, transcript_text, args.model, args.host,
+                ignore_cache=args.no_cache, chunk_tokens=args.chunk_tokens, chunk_overlap=args.chunk_overlap,
+                parallel=args.parallel, single_shot=args.single_shot, temperature=args.temperature, cache=cache,
+                metrics=metrics, stats=summary_stats, step_models=args.step_models,
+            )
+            result = {"summary": summaries} if summaries else {"error": "Failed to generate structured summary"}
+            if summaries:
+                index_video(search_index, video_id, args.language, summaries, args.host)
+        except Exception as e:
+            result = {"error": f"Summarization failed: {e}"}
+        if profiling:
+            result["profile"] = build_profile_record(video_id, args.model, args.host, transcript_stats, summary_stats,
+                                                     metrics, time.perf_counter() - started)
+            write_profile(result["profile"], metrics_log=args.metrics_log)
+        results[index].set_result(result)
+
+    def fetch(index, video_id):
+        started = time.perf_counter()
+        transcript_stats = {}
+        try:
+            # Normalization is for the model; --transcript-only prints the captions as they are
+            transcript_text = get_transcript(video_id, language=args.language, refresh=args.refresh_transcript,
+                                             stats=transcript_stats,
+                                             normalize=not (args.raw_transcript or args.transcript_only))
+        except TranscriptUnavailableError as e:
+            results[index].set_result({"error": str(e)})
+            return
+        except Exception as e:
+            results[index].set_result({"error": f"Transcript fetch failed: {e}"})
+            return
+        if args.transcript_only:
+            results[index].set_result({"transcript": transcript_text})
+        else:
+            llm_pool.submit(summarize, index, video_id, transcript_text, transcript_stats, started)
+
+    failures = 0
+    profiles = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.parallel) as llm_pool, \
+         concurrent.futures.ThreadPoolExecutor(max_workers=args.fetch_workers) as fetch_pool:
+        try:
+            for index, (url, video_id, error) in enumerate(entries):
+                if error:
+                    results[index].set_result({"error": error})
+                else:
+                    fetch_pool.submit(fetch, index, video_id)
+
+            for index, (url, video_id, _) in enumerate(entries):
+                record = {"index": index, "url": url, "video_id": video_id}
+                record.update(results[index].result())
+                record["ok"] = "error" not in record
+                failures += not record["ok"]
+                if "profile" in record:
+                    profiles.append(record["profile"])
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+        except BaseException:
+            # On an error or Ctrl-C only wait for the jobs already running, not the queue
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    if profiles and args.profile_output:
+        write_profile(profiles, profile_output=args.profile_output)
+    return failures
+
+# --- Server Mode ---
+
+class SummaryService:
+    """
+    Runs summarization jobs for the HTTP server on a bounded worker pool. Concurrent
+    requests for the same video and settings are coalesced onto one in-flight job.
+    """
+
+    def __init__(self, args, cache, search_index=None):
+        self.args = args
+        self.cache = cache
+        self.search_index = search_index
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=args.workers)
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.counters = {"requests": 0, "coalesced": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def submit(self, video_id, options):
+        """
+        Returns (future, coalesced) for a summarization job, or (None, False) if the queue
+        is full. The future resolves to (http_status, response_dict).
+        """
+        job_key = (video_id, json.dumps(options, sort_keys=True))
+        with self.lock:
+            self.counters["requests"] += 1
+            if job_key in self.inflight:
+                self.counters["coalesced"] += 1
+                return self.inflight[job_key], True
+            if len(self.inflight) >= self.args.max_queue:
+                self.counters["rejected"] += 1
+                return None, False
+            future = self.executor.submit(self._run, video_id, options)
+            self.inflight[job_key] = future
+        future.add_done_callback(lambda _: self._finish(job_key))
+        return future, False
+
+    def _finish(self, job_key):
+        with self.lock:
+            self.inflight.pop(job_key, None)
+
+    def _run(self, video_id, options):
+        args = self.args
+        try:
+            transcript_text = get_transcript(video_id, language=options["language"], refresh=args.refresh_transcript,
+                                             normalize=not args.raw_transcript)
+        except TranscriptUnavailableError as e:
+            self._count("failed")
+            return 422, {"video_id": video_id, "error": str(e)}
+        summaries = get_structured_summary(
+            video_id, transcript_text, options["model"], args.host,
+            ignore_cache=options["no_cache"], chunk_tokens=args.chunk_tokens, chunk_overlap=args.chunk_overlap,
+            parallel=args.parallel, single_shot=options["single_shot"], temperature=options["temperature"],
+            cache=self.cache, step_models=args.step_models,
+        )
+        if not summaries:
+            self._count("failed")
+            return 502, {"video_id": video_id, "error": "Failed to generate structured summary"}
+        index_video(self.search_index, video_id, options["language"], summaries, args.host)
+        self._count("completed")
+        return 200, {"video_id": video_id, "summary": summaries}
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def status(self):
+        with self.lock:
+            return dict(self.counters, in_flight=len(self.inflight), workers=self.args.workers,
+                        model=self.args.model, keep_alive=self.args.keep_alive)
+
+
+class SummaryRequestHandler(BaseHTTPRequestHandler):
+    """
+    Small JSON API:
+      POST /summarize  {"url": ..., "model"?, "single_shot"?, "temperature"?, "language"?, "no_cache"?}
+      GET  /summarize?url=...   (same, for shortcuts and quick tests)
+      GET  /status, GET /healthz
+    Summarize requests block until the summary is ready.
+    """
+    server_version = "tldw/1.0"
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/healthz":
+            self._send_json(200, {"ok": True})
+        elif parsed.path == "/status":
+            self._send_json(200, self.server.service.status())
+        elif parsed.path == "/summarize":
+            params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+            self._summarize(params)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/summarize":
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+            return
+        self._summarize(params)
+
+    def _summarize(self, params):
+        service = self.server.service
+        url = params.get("url")
+        if not url:
+            self._send_json(400, {"error": "Missing 'url'"})
+            return
+        try:
+            for name in ("url", "model", "language"):
+                if params.get(name) is not None and not isinstance(params[name], str):
+                    raise TypeError(f"'{name}' must be a string")
+            temperature = params.get("temperature", service.args.temperature)
+            if isinstance(temperature, bool) or not isinstance(temperature, (int, float, str)):
+                raise TypeError("'temperature' must be a number")
+            video_id = get_video_id(url)
+            options = {
+                "model": params.get("model") or service.args.model,
+                "single_shot": _as_bool(params.get("single_shot", service.args.single_shot)),
+                "temperature": float(temperature),
+                "language": params.get("language") or service.args.language,
+                "no_cache": _as_bool(params.get("no_cache", False)),
+            }
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        future, coalesced = service.submit(video_id, options)
+        if future is None:
+            self._send_json(503, {"error": "Queue is full, try again later"})
+            return
+        try:
+            status, result = future.result()
+        except Exception as e:
+            status, result = 500, {"video_id": video_id, "error": f"Summarization failed: {e}"}
+        self._send_json(status, dict(result, coalesced=coalesced))
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+class UnixThreadingHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer listening on a Unix domain socket."""
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        # Replace a stale socket from an earlier run, but never delete anything else
+        try:
+            mode = os.lstat(self.server_address).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"{self.server_address} exists and is not a socket")
+            os.remove(self.server_address)
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def preload_model(model_name, host_url, num_ctx=None):
+    """
+    Asks Ollama to load the model now (an empty chat) so the first request does not pay for it.
+    Pass the num_ctx the requests will use: Ollama reloads the model when it changes.
+    """
+    payload = {"model": model_name, "messages": []}
+    if num_ctx:
+        payload["options"] = {"num_ctx": num_ctx}
+    if _KEEP_ALIVE is not None:
+        payload["keep_alive"] = _KEEP_ALIVE
+    try:
+        requests.post(f"{host_url.rstrip('/')}/api/chat", json=payload, timeout=300).raise_for_status()
+        print(f"Model {model_name} loaded.")
+    except requests.exceptions.RequestException as e:
+        print(f"Warning: Could not preload model {model_name}: {e}", file=sys.stderr)
+
+def serve_main(argv):
     parser = argparse.ArgumentParser(
-        description="Generate structured summaries (paragraph, sentence, question, answer, Wikipedia term) of YouTube video transcripts using a local Ollama instance.",
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter # Show defaults in help
+        prog="tldw.py serve",
+        description="Run tldw as a long-running local HTTP service with a warm model, a bounded job queue and in-flight deduplication. "
+                    "Every request uses one context window (--num-ctx, else the model's maximum) so the model is never reloaded.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        parents=[_summary_options_parser()],
     )
-    parser.add_argument("url", help="YouTube video URL (e.g., 'https://www.youtube.com/watch?v=dQw4w9WgXcQ')")
-    parser.add_argument("-o", "--output",
-                        help="Output file path to save the structured summary as JSON (e.g., 'my_summary.json'). If directory, saves as {CACHE_DIR}/{video_id}.summaries.json")
-    parser.add_argument("-t", "--transcript-only", action="store_true",
-                        help="Only fetch and print the transcript, then exit.")
+    parser.add_argument("--bind", default=DEFAULT_SERVE_BIND, help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVE_PORT, help="TCP port to listen on.")
+    parser.add_argument("--socket", help="Listen on this Unix domain socket instead of TCP.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_PARALLEL,
+                        help="Videos summarized concurrently; further requests wait in the queue.")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_SERVE_MAX_QUEUE,
+                        help="Maximum distinct jobs queued or running before requests are rejected with 503.")
+    parser.set_defaults(keep_alive=os.environ.get('OLLAMA_KEEP_ALIVE', DEFAULT_SERVE_KEEP_ALIVE))
+    args = parser.parse_args(argv)
+    if args.workers <= 0 or args.max_queue <= 0:
+        parser.error("--workers and --max-queue must be positive")
+    cache, search_index = _configure(args, parser)
+    # One num_ctx for the preload and every job, so the warm model is never reloaded for a new size
+    num_ctx = args.num_ctx or get_model_context_length(args.model, args.host)
+    set_context_window(num_ctx)
+
+    try:
+        if args.socket:
+            server = UnixThreadingHTTPServer(args.socket, SummaryRequestHandler)
+            address = f"unix:{args.socket}"
+        else:
+            server = ThreadingHTTPServer((args.bind, args.port), SummaryRequestHandler)
+            address = f"http://{args.bind}:{args.port}"
+    except OSError as e:
+        print(f"Error: cannot listen on {args.socket or f'{args.bind}:{args.port}'}: {e}", file=sys.stderr)
+        sys.exit(1)
+    server.daemon_threads = True
+    server.service = SummaryService(args, cache, search_index)
+
+    preload_model(args.model, args.host, num_ctx)
+    print(f"tldw serving on {address} (model {args.model}, num_ctx {num_ctx or 'per request'}, "
+          f"{args.workers} workers, keep_alive {args.keep_alive})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        server.service.executor.shutdown(wait=False, cancel_futures=True)
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+# --- Search Index ---
+
+def embed_texts(texts, model_name, host_url, timeout=120):
+    """
+    Returns one embedding vector per text. Uses the batched /api/embed endpoint and falls back
+    to one /api/embeddings request per text on Ollama versions without it.
+    Raises requests.exceptions.RequestException or ValueError on failure.
+    """
+    base_url = host_url.rstrip('/')
+    with _LLM_SLOTS:
+        response = requests.post(f"{base_url}/api/embed", json={"model": model_name, "input": list(texts)}, timeout=timeout)
+        if response.status_code != 404:
+            response.raise_for_status()
+            embeddings = response.json().get('embeddings')
+            if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+                raise ValueError(f"Unexpected /api/embed response for {len(texts)} inputs")
+            return embeddings
+        embeddings = []
+        for text in texts:
+            response = requests.post(f"{base_url}/api/embeddings", json={"model": model_name, "prompt": text}, timeout=timeout)
+            response.raise_for_status()
+            embedding = response.json().get('embedding')
+            if not isinstance(embedding, list) or not embedding:
+                raise ValueError("Unexpected /api/embeddings response")
+            embeddings.append(embedding)
+        return embeddings
+
+def transcript_windows(segments, max_tokens=SEARCH_CHUNK_TOKENS, is_generated=False):
+    """Groups caption segments into (start_seconds, normalized_text) windows of about max_tokens for the search index."""
+    windows, current, current_chars = [], [], 0
+    for segment in segments:
+        current.append(segment)
+        current_chars += len(segment['text'])
+        if current_chars >= max_tokens * CHARS_PER_TOKEN:
+            windows.append(current)
+            current, current_chars = [], 0
+    if current:
+        windows.append(current)
+    return [(window[0]['start'], text) for window in windows if (text := normalize_segments(window, is_generated))]
+
+class SearchIndex:
+    """
+    Embedding index over cached summaries and stored transcripts, for 'tldw.py search'.
+
+    Vectors are unit-normalized float32 rows appended to vectors.f32 and read back as a
+    NumPy memory map, so a query is a single matrix-vector product over the whole index
+    (brute force; a few milliseconds at tens of thousands of rows). An SQLite table maps
+    each row to its video, kind ('summary' or 'transcript'), start time and text. Items are
+    keyed by content, so indexing the same video again only embeds what is new.
+    NumPy is imported only when vectors are written or searched.
+    """
+
+    def __init__(self, cache_dir=None, embed_model=DEFAULT_EMBED_MODEL):
+        self.index_dir = os.path.join(cache_dir or CACHE_DIR, SEARCH_SUBDIR)
+        self.vectors_path = os.path.join(self.index_dir, "vectors.f32")
+        self.db_path = os.path.join(self.index_dir, "items.sqlite3")
+        self.embed_model = embed_model
+        self.disabled = False
+        self._lock = threading.Lock()
+        os.makedirs(self.index_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS items (
+                row INTEGER PRIMARY KEY,
+                item_key TEXT UNIQUE,
+                kind TEXT,
+                video_id TEXT,
+                start_s REAL,
+                text TEXT,
+                created_at REAL)""")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self):
+        return contextlib.closing(sqlite3.connect(self.db_path, timeout=30, isolation_level=None))
+
+    def _meta(self, conn):
+        meta = dict(conn.execute("SELECT name, value FROM meta").fetchall())
+        return meta.get('model'), int(meta['dim']) if 'dim' in meta else None
+
+    @staticmethod
+    def make_item_key(kind, video_id, text):
+        return hashlib.sha256(json.dumps([kind, video_id, text]).encode('utf-8')).hexdigest()
+
+    def add_items(self, items, host_url):
+        """
+        Embeds and appends the (kind, video_id, start_s, text) items not yet in the index.
+        Returns the number of items added.
+        """
+        keyed = {self.make_item_key(kind, video_id, text): (kind, video_id, start_s, text)
+                 for kind, video_id, start_s, text in items}
+        with self._connect() as conn:
+            existing = {key for key in keyed
+                        if conn.execute("SELECT 1 FROM items WHERE item_key = ?", (key,)).fetchone()}
+            model, dim = self._meta(conn)
+        new_keys = [key for key in keyed if key not in existing]
+        if not new_keys:
+            return 0
+        if model is not None and model != self.embed_model:
+            raise ValueError(f"Search index was built with {model}; rebuild it with 'tldw.py search --reindex'")
+
+        import numpy as np
+        vectors = []
+        for start in range(0, len(new_keys), SEARCH_EMBED_BATCH):
+            batch = new_keys[start:start + SEARCH_EMBED_BATCH]
+            vectors.extend(embed_texts([keyed[key][3] for key in batch], self.embed_model, host_url))
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if dim is not None and matrix.shape[1] != dim:
+            raise ValueError(f"Embedding size changed from {dim} to {matrix.shape[1]}; rebuild the index with --reindex")
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            # O_APPEND keeps concurrent writers from interleaving; rows are numbered from the file offset
+            fd = os.open(self.vectors_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, matrix.tobytes())
+                end = os.lseek(fd, 0, os.SEEK_CUR)
+            finally:
+                os.close(fd)
+            first_row = end // matrix[0].nbytes - len(new_keys)
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                                 [('model', self.embed_model), ('dim', str(matrix.shape[1]))])
+                conn.executemany(
+                    "INSERT OR IGNORE INTO items (row, item_key, kind, video_id, start_s, text, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(first_row + offset, key, *keyed[key], now) for offset, key in enumerate(new_keys)])
+                conn.execute("COMMIT")
+        return len(new_keys)
+
+    def add_video(self, video_id, language, summaries, host_url):
+        """Indexes a video's summary and its stored transcript in windows. Returns the number of new items."""
+        items = []
+        if summaries:
+            summary_text = " ".join(summaries.get(key, '') for key in ('paragraph', 'sentence', 'question')).strip()
+            if summary_text:
+                items.append(('summary', video_id, None, summary_text))
+        record = load_transcript_record(video_id, language) if language else None
+        if record is not None:
+            windows = transcript_windows(record['segments'], is_generated=record.get('is_generated', False))
+            items.extend(('transcript', video_id, start, text) for start, text in windows)
+        return self.add_items(items, host_url) if items else 0
+
+    def search(self, query, host_url, top_k=10, kind=None):
+        """Returns up to top_k hits as dicts (score, kind, video_id, start_s, text), best first."""
+        import numpy as np
+        with self._connect() as conn:
+            model, dim = self._meta(conn)
+            if dim is None:
+                return []
+            if model != self.embed_model:
+                raise ValueError(f"Search index was built with {model}, not {self.embed_model}; "
+                                 f"use --embed-model {model} or rebuild it with --reindex")
+            rows = None
+            if kind:
+                rows = np.fromiter((row for (row,) in conn.execute("SELECT row FROM items WHERE kind = ?", (kind,))),
+                                   dtype=np.int64)
+        n_rows = os.path.getsize(self.vectors_path) // (dim * 4)
+        if n_rows == 0:
+            return []
+        vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(n_rows, dim))
+        query_vector = np.asarray(embed_texts([query], self.embed_model, host_url)[0], dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+
+        if rows is not None:
+            rows = rows[rows < n_rows]
+            scores = vectors[rows] @ query_vector
+        else:
+            scores = vectors @ query_vector
+        if scores.size == 0:
+            return []
+        # Rows without an items entry (an interrupted write) are skipped, so take a few spare candidates
+        top_n = min(scores.size, top_k + SEARCH_SPARE_CANDIDATES)
+        best = np.argpartition(-scores, top_n - 1)[:top_n]
+        best = best[np.argsort(-scores[best])]
+        candidates = [(int(rows[i]) if rows is not None else int(i), float(scores[i])) for i in best]
+
+        hits = []
+        with self._connect() as conn:
+            for row, score in candidates:
+                item = conn.execute("SELECT kind, video_id, start_s, text FROM items WHERE row = ?", (row,)).fetchone()
+                if item is not None:
+                    hits.append(dict(score=round(score, 4), kind=item[0], video_id=item[1], start_s=item[2], text=item[3]))
+                if len(hits) == top_k:
+                    break
+        return hits
+
+    def clear(self):
+        """Empties the index (vectors and item map)."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM meta")
+            if os.path.exists(self.vectors_path):
+                os.remove(self.vectors_path)
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+def index_video(search_index, video_id, language, summaries, host_url):
+    """
+    Adds a video to the search index on write. Failures (e.g. the embedding model is not
+    pulled, or NumPy is missing) are reported once and turn indexing off for this run.
+    """
+    if search_index is None or search_index.disabled:
+        return
+    try:
+        search_index.add_video(video_id, language, summaries, host_url)
+    except (requests.exceptions.RequestException, ValueError, ImportError, OSError, sqlite3.Error) as e:
+        search_index.disabled = True
+        print(f"Warning: Search indexing disabled for this run: {e} "
+              f"(pull the model with 'ollama pull {search_index.embed_model}' or pass --no-index)", file=sys.stderr)
+
+def rebuild_search_index(search_index, cache, host_url):
+    """Re-embeds every cached summary and stored transcript. Returns the number of items indexed."""
+    search_index.clear()
+    # The most recently used summary of each video wins
+    summaries_by_video = dict(cache.iter_entries())
+
+    transcript_dir = os.path.join(CACHE_DIR, TRANSCRIPT_SUBDIR)
+    stored = sorted(name[:-len(".json.gz")].rsplit('.', 1) for name in os.listdir(transcript_dir)
+                    if name.endswith(".json.gz")) if os.path.isdir(transcript_dir) else []
+    added = 0
+    for video_id, language in stored:
+        added += search_index.add_video(video_id, language, summaries_by_video.pop(video_id, None), host_url)
+    for video_id, summaries in summaries_by_video.items():
+        added += search_index.add_video(video_id, None, summaries, host_url)
+    return added
+
+def search_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="tldw.py search",
+        description="Semantic search over cached summaries and stored transcripts.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("query", nargs="?", help="What to look for.")
+    parser.add_argument("-k", "--top-k", type=int, default=10, help="Number of results.")
+    parser.add_argument("--kind", choices=("summary", "transcript"), help="Only search summaries or transcript passages.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines.")
+    parser.add_argument("--reindex", action="store_true",
+                        help="Rebuild the index from the summary cache and transcript store before searching.")
+    parser.add_argument("--host", default=os.environ.get('OLLAMA_HOST', DEFAULT_OLLAMA_HOST),
+                        help="Ollama host URL (or set OLLAMA_HOST env var)")
+    parser.add_argument("--embed-model", default=os.environ.get('TLDW_EMBED_MODEL', DEFAULT_EMBED_MODEL),
+                        help="Ollama embedding model (or set TLDW_EMBED_MODEL env var)")
+    args = parser.parse_args(argv)
+    if not args.query and not args.reindex:
+        parser.error("a query is required (or --reindex)")
+    if args.top_k <= 0:
+        parser.error("--top-k must be positive")
+
+    ensure_cache_dir()
+    search_index = SearchIndex(embed_model=args.embed_model)
+    try:
+        if args.reindex:
+            added = rebuild_search_index(search_index, SummaryCache(), args.host)
+            print(f"Indexed {added} items.", file=sys.stderr)
+        if not args.query:
+            return
+        started = time.perf_counter()
+        hits = search_index.search(args.query, args.host, top_k=args.top_k, kind=args.kind)
+    except ImportError:
+        print("Error: 'tldw.py search' needs NumPy (pip install numpy).", file=sys.stderr)
+        sys.exit(1)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Error: Search failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for hit in hits:
+        url = f"https://youtu.be/{hit['video_id']}"
+        if hit['start_s'] is not None:
+            url += f"?t={int(hit['start_s'])}"
+        if args.json:
+            print(json.dumps(dict(hit, url=url), ensure_ascii=False))
+        else:
+            text = " ".join(hit['text'].split())
+            snippet = text if len(text) <= 200 else text[:197] + "..."
+            print(f"{hit['score']:.3f}  {hit['kind']:<10}  {url}\n       {snippet}")
+    print(f"{len(hits)} results from {search_index.count()} indexed items in {elapsed_ms:.0f} ms", file=sys.stderr)
+
+# --- Main Execution ---
+def _summary_options_parser():
+    """Options shared by one-off runs and 'serve': model, Ollama host, cache and generation settings."""
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument("--model", default=os.environ.get('OLLAMA_MODEL', DEFAULT_OLLAMA_MODEL),
                         help="Ollama model to use (or set OLLAMA_MODEL env var)")
     parser.add_argument("--host", default=os.environ.get('OLLAMA_HOST', DEFAULT_OLLAMA_HOST),
                         help="Ollama host URL (or set OLLAMA_HOST env var)")
     parser.add_argument("--no-cache", action="store_true",
-                        help="Force regeneration, ignore and overwrite existing cache file for this video.")
-    # Could add an argument to override temperature if desired:
-    # parser.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE,
-    #                     help="Set the generation temperature (0.0 for deterministic).")
+                        help="Force regeneration, ignore and overwrite the cached summary for this video and settings.")
+    parser.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE,
+                        help="Set the generation temperature (0.0 for deterministic).")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help="Evict least recently used cached summaries beyond this size (0 disables).")
+    parser.add_argument("--cache-max-age-days", type=float, default=DEFAULT_CACHE_MAX_AGE_DAYS,
+                        help="Evict cached summaries not used for this many days (0 disables).")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE,
+                        help="Transcript language code to fetch (manual transcripts are preferred over generated ones).")
+    parser.add_argument("--refresh-transcript", action="store_true",
+                        help="Refetch the transcript from YouTube even if it is in the local transcript store.")
+    parser.add_argument("--raw-transcript", action="store_true",
+                        help="Send the captions verbatim instead of normalizing them (markers, rolling repeats and fillers removed).")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS,
+                        help="Transcripts longer than this many (estimated) tokens are split into chunks and summarized map-reduce style.")
+    parser.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNK_OVERLAP,
+                        help="Tokens of transcript repeated between adjacent chunks.")
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                        help="Maximum concurrent Ollama requests; match the server's OLLAMA_NUM_PARALLEL (or set OLLAMA_NUM_PARALLEL env var)")
+    parser.add_argument("--single-shot", action="store_true",
+                        help="Request all five summary fields in one JSON-schema constrained call instead of five sequential ones; fields that fail validation fall back to the multi-turn path.")
+    parser.add_argument("--short-model", default=os.environ.get('TLDW_SHORT_MODEL'),
+                        help="Smaller model for the short follow-up steps (sentence, question, answer, Wikipedia term), "
+                             "which then get the paragraph summary as context instead of the transcript (or set TLDW_SHORT_MODEL env var).")
+    parser.add_argument("--step-model", action="append", metavar="STEP=MODEL",
+                        help=f"Route one step to its own model (repeatable; overrides --short-model). Steps: {', '.join(SCHEMA_FIELD_KEYS)}.")
+    parser.add_argument("--embed-model", default=os.environ.get('TLDW_EMBED_MODEL', DEFAULT_EMBED_MODEL),
+                        help="Ollama embedding model for the search index (or set TLDW_EMBED_MODEL env var)")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Do not add new summaries and transcripts to the search index.")
+    parser.add_argument("--num-ctx", type=int, default=0,
+                        help="Fixed context window for every request; 0 sizes it per request from the prompt length, capped at the model's maximum.")
+    parser.add_argument("--keep-alive", default=os.environ.get('OLLAMA_KEEP_ALIVE'),
+                        help="How long Ollama keeps the model loaded after a request (e.g. '30m', '-1' for forever); defaults to the server's setting.")
+    return parser
 
-    args = parser.parse_args()
+def _configure(args, parser):
+    """
+    Validates the shared options, applies the process-wide Ollama settings and returns the
+    SummaryCache and the SearchIndex (None with --no-index).
+    """
+    if args.chunk_tokens <= 0 or args.chunk_overlap < 0 or args.parallel <= 0 or args.num_ctx < 0:
+        parser.error("--chunk-tokens and --parallel must be positive and --chunk-overlap and --num-ctx non-negative")
+    try:
+        args.step_models = parse_step_models(args.step_model, args.short_model)
+    except ValueError as e:
+        parser.error(str(e))
+    set_llm_parallelism(args.parallel)
+    set_context_window(args.num_ctx)
+    set_keep_alive(args.keep_alive)
 
     ensure_cache_dir()
+    cache = SummaryCache(
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        max_age_s=args.cache_max_age_days * 86400,
+    )
+    return cache, None if args.no_index else SearchIndex(embed_model=args.embed_model)
 
-    try:
-        video_id = get_video_id(args.url)
-    except ValueError as e:
-        print(f"Error: {e}", file=sys.stderr)
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'search':
+        search_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Generate structured summaries (paragraph, sentence, question, answer, Wikipedia term) of YouTube video transcripts using a local Ollama instance.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter, # Show defaults in help
+        parents=[_summary_options_parser()],
+        epilog="Run '%(prog)s serve --help' for the long-running server mode and '%(prog)s search --help' to search past summaries.",
+    )
+    parser.add_argument("urls", nargs="*", metavar="url",
+                        help="YouTube video or playlist URL(s) (e.g., 'https://www.youtube.com/watch?v=dQw4w9WgXcQ')")
+    parser.add_argument("-i", "--input-file",
+                        help="Read additional URLs from this file, one per line ('-' for stdin).")
+    parser.add_argument("-o", "--output",
+                        help="Output file path to save the structured summary as JSON (e.g., 'my_summary.json'). If directory, saves as {output}/{video_id}.summaries.json. In batch mode, the JSONL results file.")
+    parser.add_argument("--jsonl", action="store_true",
+                        help="Emit one JSON record per video (JSONL) even for a single URL. Implied when several videos are given.")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS,
+                        help="Concurrent transcript fetches in batch mode.")
+    parser.add_argument("-t", "--transcript-only", action="store_true",
+                        help="Only fetch and print the transcript, then exit.")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="Print summary cache statistics (entries, size, hit/miss counts) and exit.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print a per-step breakdown of model load, prompt evaluation and generation time, plus transcript fetch time and cache outcome.")
+    parser.add_argument("--profile-output",
+                        help="Write the profile as JSON to this file (implies --profile).")
+    parser.add_argument("--metrics-log",
+                        help="Append one JSON profile record per video to this log file (implies --profile).")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream responses from Ollama, printing the paragraph summary as it is generated and reporting time-to-first-token and tokens/sec per step.")
+    args = parser.parse_args()
+
+    if args.fetch_workers <= 0:
+        parser.error("--fetch-workers must be positive")
+    cache, search_index = _configure(args, parser)
+
+    if args.cache_stats:
+        stats = cache.stats()
+        print(f"Summary cache: {cache.summary_dir}")
+        print(f"Entries           : {stats['entries']} summaries, {stats['chunk_entries']} chunk summaries")
+        print(f"Size              : {stats['bytes'] / (1024 * 1024):.2f} MB of {stats['max_bytes'] / (1024 * 1024):.0f} MB")
+        print(f"Hits / misses     : {stats['hits']} / {stats['misses']} ({stats['hit_rate']:.0%} hit rate)")
+        sys.exit(0)
+
+    urls = list(args.urls)
+    if args.input_file:
+        try:
+            urls += read_url_list(args.input_file)
+        except IOError as e:
+            print(f"Error reading URL list {args.input_file}: {e}", file=sys.stderr)
+            sys.exit(1)
+    if not urls:
+        parser.error("at least one YouTube URL is required")
+
+    entries = resolve_inputs(urls)
+    if len(entries) > 1 or args.jsonl:
+        out = sys.stdout
+        try:
+            if args.output:
+                out = open(args.output, 'w', encoding='utf-8')
+            # Progress messages go to stderr so stdout carries only JSONL records
+            with contextlib.redirect_stdout(sys.stderr):
+                failures = run_batch(entries, args, cache, out, search_index)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"Processed {len(entries)} videos, {failures} failed.", file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+    url, video_id, error = entries[0]
+    if error:
+        print(f"Error: {error}", file=sys.stderr)
         sys.exit(1)
-    except Exception as e:
-         print(f"An unexpected error occurred parsing the URL '{args.url}': {e}", file=sys.stderr)
-         sys.exit(1)
 
     print(f"Processing Video ID: {video_id}")
 
-    transcript_text = get_transcript(video_id)
+    started = time.perf_counter()
+    transcript_stats = {}
+    try:
+        # Normalization is for the model; --transcript-only prints the captions as they are
+        transcript_text = get_transcript(video_id, language=args.language, refresh=args.refresh_transcript,
+                                         stats=transcript_stats,
+                                         normalize=not (args.raw_transcript or args.transcript_only))
+    except TranscriptUnavailableError:
+        sys.exit(1)
 
     if args.transcript_only:
         print("\n--- Transcript ---")
@@ -333,16 +2279,34 @@ def main():
                  print(f"Error writing transcript to file {transcript_outfile}: {e}", file=sys.stderr)
         sys.exit(0)
 
+    metrics = []
+    summary_stats = {}
     structured_summaries = get_structured_summary(
         video_id,
         transcript_text,
         args.model,
         args.host,
-        ignore_cache=args.no_cache
-        # If --temperature arg was added: pass args.temperature to _ollama_chat_completion calls if needed
+        ignore_cache=args.no_cache,
+        chunk_tokens=args.chunk_tokens,
+        chunk_overlap=args.chunk_overlap,
+        parallel=args.parallel,
+        single_shot=args.single_shot,
+        stream=args.stream,
+        temperature=args.temperature,
+        cache=cache,
+        metrics=metrics,
+        stats=summary_stats,
+        step_models=args.step_models,
     )
 
+    if profiling_enabled(args):
+        profile = build_profile_record(video_id, args.model, args.host, transcript_stats, summary_stats,
+                                       metrics, time.perf_counter() - started)
+        print_profile(profile)
+        write_profile(profile, profile_output=args.profile_output, metrics_log=args.metrics_log)
+
     if structured_summaries:
+        index_video(search_index, video_id, args.language, structured_summaries, args.host)
         print("\n--- Final Structured Summary ---")
         keys_to_print = ['paragraph', 'sentence', 'question', 'word', 'wikipedia_term', 'wikipedia_url']
         for key in keys_to_print:
@@ -355,9 +2319,10 @@ def main():
         if args.output:
             json_outfile = args.output
             if os.path.isdir(json_outfile):
-                 json_outfile = os.path.join(CACHE_DIR, f"{video_id}.summaries.json")
+                 json_outfile = os.path.join(json_outfile, f"{video_id}.summaries.json")
             try:
-                os.makedirs(os.path.dirname(json_outfile), exist_ok=True)
+                if os.path.dirname(json_outfile):
+                    os.makedirs(os.path.dirname(json_outfile), exist_ok=True)
                 with open(json_outfile, 'w', encoding='utf-8') as f:
                      json.dump(structured_summaries, f, indent=4, ensure_ascii=False)
                 print(f"\nStructured summary also saved to: {json_outfile}")